@@ -0,0 +1,383 @@
+# benchmark.py
+"""
+Benchmarks for chatbot-pipelinen, så vi ser om en endring i chatbot_core
+gjør workerne tregere.
+
+  micro   enkeltfunksjoner: norm, levenshtein, fuzzy_includes, autocorrect_text,
+          extract_keywords, detect_lang_rule, ml_predict_intent, get_intent,
+          og VocabCorrector.nearest på syntetiske vokabular med 1 000 og 10 000
+          ord (tiden pr. oppslag skal være omtrent lik – ikke vokse med vokabularet)
+  macro   handle_message og endepunktene i handler.py (httpx + ASGI i samme
+          prosess), med en lokal falsk oversetter uten latens. Korpuset er
+          lite, så etter første runde er alt treff i INTENT_CACHE; "(uncached)"-
+          variantene tømmer cachen før hvert kall og måler stavekorreksjon,
+          regler og ML
+
+Alt kjøres på det faste, flerspråklige CORPUS under. For hver benchmark
+skrives kall/s, latens (p50/p95/p99) og allokering pr. kall (tracemalloc,
+egen runde så målingen ikke påvirker tidene).
+
+    python benchmark.py                              # alt, tabell på stdout
+    python benchmark.py --only micro -k fuzzy        # bare micro, navn som inneholder "fuzzy"
+    python benchmark.py --out bench.json             # lagre resultatene
+    python benchmark.py --compare bench.json --threshold 0.15
+        # feiler (exit 1) hvis en benchmark har mer enn 15 % færre kall/s enn i bench.json
+
+Kjør med PYTHONHASHSEED=0 for mest mulig like tall mellom kjøringer.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+FORMAT_VERSION = 1
+
+# fast korpus: norsk (med og uten stavefeil), engelsk, spansk, tysk, fransk, emoji
+CORPUS = [
+    "hei",
+    "hei hei, hvordan går det?",
+    "hva koster vote",
+    "hva er prisen på spillet",
+    "når kommer spillet ut",
+    "når er lanseringen av vote",
+    "hvordan er gameplay",
+    "hvirdan funker gamleplay i vote",
+    "hva er vintra studio",
+    "hva er vote for noe",
+    "hvem lager vote",
+    "hvor mange er dere i teamet",
+    "jeg trenger hjelp fra support",
+    "jeg vil lage en ticket om en feil i spillet",
+    "ja",
+    "nei takk",
+    "takk for hjelpen",
+    "ha det bra",
+    "lager dere nettsider også?",
+    "jeg",
+    "hva er været i morgen",
+    "😀",
+    "👍👍",
+    "hello",
+    "what is the price of vote",
+    "when is the game out",
+    "who makes vote and how big is the team",
+    "i need help with my account",
+    "thanks, bye",
+    "hola, cuánto cuesta vote",
+    "cuándo sale el juego",
+    "hallo, wie viel kostet das spiel",
+    "wann erscheint vote",
+    "bonjour, combien coûte le jeu",
+    "qui développe vote",
+    "hva er lansringsdatoen for vote?",
+    "kan du hjelpe meg med en sak",
+    "admin",
+    "pris",
+    "what's the weather like",
+]
+
+WORD_PAIRS = [
+    ("hvordan", "hvirdan"),
+    ("gameplay", "gamleplay"),
+    ("lansering", "lansring"),
+    ("support", "suport"),
+    ("vintra studio", "vintra studios"),
+    ("hva koster vote", "hva kostet vote"),
+]
+
+
+# ===================== MÅLING =====================
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def _allocations(fn, inputs) -> dict:
+    """Gjennomsnittlig og største topp-allokering (bytes) pr. kall."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for x in inputs:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn(x)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(max(0, peak - before))
+    finally:
+        tracemalloc.stop()
+    return {"alloc_mean_bytes": statistics.fmean(peaks), "alloc_max_bytes": max(peaks)}
+
+
+def run_benchmark(name: str, fn, inputs, min_time: float) -> dict:
+    """Kjør fn over inputs i minst min_time sekunder (etter én oppvarmingsrunde)."""
+    inputs = list(inputs)
+    for x in inputs:
+        fn(x)
+
+    samples: list[float] = []
+    clock = time.perf_counter
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()  # ingen tilfeldige GC-pauser midt i en måling
+    try:
+        deadline = clock() + min_time
+        while True:
+            for x in inputs:
+                t0 = clock()
+                fn(x)
+                samples.append(clock() - t0)
+            if clock() >= deadline:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    samples.sort()
+    total = sum(samples)
+    result = {
+        "name": name,
+        "calls": len(samples),
+        "ops_per_sec": len(samples) / total if total else 0.0,
+        "mean_us": total / len(samples) * 1e6,
+        "p50_us": _percentile(samples, 0.50) * 1e6,
+        "p95_us": _percentile(samples, 0.95) * 1e6,
+        "p99_us": _percentile(samples, 0.99) * 1e6,
+    }
+    result.update(_allocations(fn, inputs))
+    return result
+
+
+# ===================== BENCHMARKS =====================
+
+def _stub_translator() -> None:
+    """Lokal falsk oversetter uten latens og uten cache – ingen nettverk."""
+    import translation
+
+    translation.set_translator(translation.Translator(
+        translation.FakeBackend(latency=0.0),
+        translation.TranslationCache(max_entries=0),
+    ))
+
+
+def _synthetic_vocab(size: int, seed: int = 0) -> tuple[list[str], list[str]]:
+    """(vokabular, oppslag med 0–2 skrivefeil) – samme ord for samme size/seed."""
+    rnd = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzæøå"
+    vocab = list(dict.fromkeys(
+        "".join(rnd.choice(alphabet) for _ in range(rnd.randint(3, 12))) for _ in range(size)
+    ))
+    lookups = []
+    for word in rnd.sample(vocab, 200):
+        chars = list(word)
+        for _ in range(rnd.randint(0, 2)):
+            i = rnd.randrange(len(chars))
+            chars[i] = rnd.choice(alphabet)
+        lookups.append("".join(chars))
+    return vocab, lookups
+
+
+def micro_benchmarks() -> dict:
+    """navn -> (funksjon, inputs)"""
+    import chatbot_core as core
+
+    core.ensure_intent_model()
+    messages = [core.parse_message(text) for text in CORPUS]
+    state = core.ChatState()
+
+    def get_intent_uncached(text):
+        core.INTENT_CACHE.clear()
+        return core.get_intent(text, state)
+
+    vocab_benchmarks = {}
+    for size in (1_000, 10_000):
+        vocab, lookups = _synthetic_vocab(size)
+        index = core.VocabCorrector([(w, w) for w in vocab])
+        vocab_benchmarks[f"vocab_nearest ({size})"] = (lambda tok, index=index: index.nearest(tok, 2), lookups)
+
+    return {
+        "norm": (core.norm, CORPUS),
+        "levenshtein": (lambda pair: core.levenshtein(*pair), WORD_PAIRS),
+        "fuzzy_includes": (lambda msg: core.fuzzy_includes(msg, core.FZ_PRICE), messages),
+        "autocorrect_text": (core.autocorrect_text, CORPUS),
+        "extract_keywords": (core.extract_keywords, CORPUS),
+        "detect_lang_rule": (core.detect_lang_rule, CORPUS),
+        "ml_predict_intent": (core.ml_predict_intent, CORPUS),
+        "get_intent": (get_intent_uncached, CORPUS),
+        "get_intent_cached": (lambda text: core.get_intent(text, state), CORPUS),
+        **vocab_benchmarks,
+    }
+
+
+def _uncached(fn):
+    """fn med tom INTENT_CACHE før hvert kall."""
+    import chatbot_core as core
+
+    def call(x):
+        core.INTENT_CACHE.clear()
+        return fn(x)
+    return call
+
+
+def macro_benchmarks() -> dict:
+    import chatbot_core as core
+
+    handle = lambda text: core.handle_message(text, core.ChatState())
+    benchmarks = {
+        "handle_message": (handle, CORPUS),
+        "handle_message (uncached)": (_uncached(handle), CORPUS),
+    }
+
+    try:
+        import httpx
+        import handler
+    except ImportError as e:
+        print(f"hopper over endepunkt-benchmarks ({e})", file=sys.stderr)
+        return benchmarks
+
+    # én loop for alle kall; run_until_complete legger på noen få µs pr. kall
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=handler.app), base_url="http://bench")
+
+    def request(method: str, path: str, body=None):
+        resp = loop.run_until_complete(client.request(method, path, json=body))
+        resp.raise_for_status()
+        return resp
+
+    chunks = [CORPUS[i:i + 10] for i in range(0, len(CORPUS), 10)]
+    chat = lambda i: request("POST", "/api/chat", {"session_id": f"b{i % 8}", "text": CORPUS[i]})
+    benchmarks.update({
+        "POST /api/chat": (chat, range(len(CORPUS))),
+        "POST /api/chat (uncached)": (_uncached(chat), range(len(CORPUS))),
+        "POST /api/chat/batch (10)": (
+            lambda chunk: request("POST", "/api/chat/batch", {
+                "messages": [{"session_id": f"b{i}", "text": text} for i, text in enumerate(chunk)],
+            }),
+            chunks,
+        ),
+        "POST /api/chat/batch (10, uncached)": (
+            _uncached(lambda chunk: request("POST", "/api/chat/batch", {
+                "messages": [{"session_id": f"b{i}", "text": text} for i, text in enumerate(chunk)],
+            })),
+            chunks,
+        ),
+        "GET /metrics": (lambda _: request("GET", "/metrics"), range(5)),
+    })
+    return benchmarks
+
+
+def run(only: str | None, pattern: str | None, min_time: float) -> dict:
+    random.seed(0)  # reply_for velger tilfeldige varianter
+    _stub_translator()
+    from chatbot_core import warmup
+    warmup()
+
+    groups = {}
+    if only in (None, "micro"):
+        groups["micro"] = micro_benchmarks()
+    if only in (None, "macro"):
+        groups["macro"] = macro_benchmarks()
+
+    results = []
+    for group, benchmarks in groups.items():
+        for name, (fn, inputs) in benchmarks.items():
+            if pattern and pattern not in name:
+                continue
+            result = run_benchmark(name, fn, inputs, min_time)
+            result["group"] = group
+            _print_result(result)
+            results.append(result)
+
+    return {
+        "version": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": _environment(),
+        "min_time": min_time,
+        "results": results,
+    }
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pythonhashseed": os.environ.get("PYTHONHASHSEED"),
+        "metrics": os.environ.get("CHATBOT_METRICS", "1"),
+        "commit": commit,
+    }
+
+
+# ===================== RAPPORT / SAMMENLIGNING =====================
+
+def _print_result(r: dict) -> None:
+    print(
+        f"{r['name']:36s} {r['ops_per_sec']:12.1f} kall/s  p50={r['p50_us']:9.1f}µs "
+        f"p95={r['p95_us']:9.1f}µs p99={r['p99_us']:9.1f}µs  alloc={r['alloc_mean_bytes']:9.0f}B"
+    )
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """Navn på benchmarks med mer enn threshold (andel) færre kall/s enn i old."""
+    before = {r["name"]: r for r in old.get("results", [])}
+    regressions = []
+    print(f"\n{'benchmark':36s} {'før':>12s} {'nå':>12s}   endring")
+    for r in new["results"]:
+        o = before.get(r["name"])
+        if o is None or not o["ops_per_sec"]:
+            continue
+        change = r["ops_per_sec"] / o["ops_per_sec"] - 1.0
+        slow = change < -threshold
+        if slow:
+            regressions.append(r["name"])
+        print(
+            f"{r['name']:36s} {o['ops_per_sec']:12.1f} {r['ops_per_sec']:12.1f}  "
+            f"{change * 100:+7.1f}%{'  << TREGERE' if slow else ''}"
+        )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks for chatbot-pipelinen.")
+    parser.add_argument("--only", choices=["micro", "macro"], help="bare én av gruppene")
+    parser.add_argument("-k", dest="pattern", help="bare benchmarks med denne teksten i navnet")
+    parser.add_argument("--min-time", type=float, default=1.0, help="sekunder pr. benchmark")
+    parser.add_argument("--out", help="skriv resultatene som JSON hit")
+    parser.add_argument("--compare", help="tidligere JSON-resultat å sammenligne med")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="tillatt nedgang i kall/s før det regnes som regresjon (0.15 = 15 %%)")
+    args = parser.parse_args(argv)
+
+    report = run(args.only, args.pattern, args.min_time)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        regressions = compare(old, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regresjon(er) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
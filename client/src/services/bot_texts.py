@@ -102,10 +102,88 @@ GAMEPLAY_WORDS = [
 
 DOMAIN_WORDS = ["vote", "vintra", "vintra studio"]
 
+# ========= FRASER BRUKT I get_intent =========
+
+# mengde-ord som, sammen med et domene-ord, betyr spørsmål om team-størrelse
+TEAM_SIZE_WORDS = [
+    "hvor mange",
+    "hvor stort",
+    "hvor stor er",
+    "hvor stort er",
+    "størrelse",
+]
+
+WHAT_IS_VINTRA_WORDS = [
+    "hva er vintra",
+    "hva er vintra studio",
+    "om vintra",
+    "om vintra studio",
+]
+
+WHAT_IS_VOTE_WORDS = [
+    "hva er vote",
+    "hva går vote ut på",
+    "hva går spillet ut på",
+    "hva handler vote om",
+    "om vote",
+]
+
+TEAM_WORDS = [
+    "hvem lager vote",
+    "team",
+    "utviklere",
+    "hvor mange jobber",
+    # engelsk variant – i tilfelle vi ikke oversetter
+    "who makes vote",
+]
+
+PRICE_WORDS = [
+    "pris",
+    "kost",
+    "koster",
+    "koste",
+    "hva koster",
+    "hva blir prisen",
+    "hvor mye",
+    "hvor mye vil",
+]
+
+SUPPORT_WORDS = [
+    "hjelp",
+    "assist",
+    "guide",
+    "støtte",
+    "support",
+    "ticket",
+    "sak",
+    "henvendelse",
+    "kundeservice",
+    "lag sak",
+    "opprett ticket",
+]
+
+# oppfølgingsspørsmål når vi nettopp snakket om VOTE
+FOLLOWUP_WHAT_WORDS = ["hva går det ut på"]
+FOLLOWUP_WHO_WORDS = ["hvem lager det"]
+
 AMBIGUOUS_GREETINGS = {
     "hei", "hello", "hi", "hola", "bonjour", "hallo", "hej", "moi",
 }
 
+# ========= SPRÅK-HINT (detect_lang_rule) =========
+# typiske ord pr. språk. Rekkefølgen er prioritet ved likt poeng;
+# ord som deler flere språk teller mindre for hvert av dem.
+
+LANG_HINT_WORDS = {
+    "no": ["hva", "hvor", "hvem", "hvordan", "hvorfor", "når", "hei", "pris", "billett", "støtte", "hjelp", "ticket"],
+    "da": ["hej", "hvordan", "pris", "billet", "støtte"],
+    "sv": ["hej", "pris", "stöd", "biljett"],
+    "es": ["hola", "precio", "ayuda", "soporte", "ticket"],
+    "fr": ["bonjour", "prix", "aide", "billet", "support"],
+    "de": ["hallo", "preis", "hilfe", "ticket", "unterstützung"],
+    "fi": ["moi", "hinta", "lippu", "tuki"],
+}
+
 # ========= ML-TRENINGSData =========
 
 ML_TRAIN_DATA = [
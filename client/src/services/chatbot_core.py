@@ -1,7 +1,17 @@
 # chatbot_core.py
+import time
+
+_IMPORT_T0 = time.perf_counter()
+
+import asyncio
+import hashlib
+import json
+import os
 import unicodedata
 import re
 import random  # for varierte svar / "følelser"
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 
 from bot_texts import (
@@ -10,90 +20,204 @@ from bot_texts import (
     YES_WORDS, NO_WORDS,
     THANK_WORDS, GREET_WORDS, FAREWELL_WORDS,
     ADMIN_WORDS, RELEASE_WORDS, RELEASE_QUESTION_WORDS,
-    GAMEPLAY_WORDS, DOMAIN_WORDS,
+    GAMEPLAY_WORDS, DOMAIN_WORDS, TEAM_SIZE_WORDS,
+    WHAT_IS_VINTRA_WORDS, WHAT_IS_VOTE_WORDS, TEAM_WORDS,
+    PRICE_WORDS, SUPPORT_WORDS,
+    FOLLOWUP_WHAT_WORDS, FOLLOWUP_WHO_WORDS,
     AMBIGUOUS_GREETINGS,
+    LANG_HINT_WORDS,
     ML_TRAIN_DATA,
     REPLY_TEMPLATES,
 )
-
-try:
-    from deep_translator import GoogleTranslator as GT
-except Exception:
-    GT = None
-
-# ML / NLP
-try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.linear_model import LogisticRegression
-except Exception:
-    TfidfVectorizer = None
-    LogisticRegression = None
-
-try:  # spaCy er valgfritt – brukes hvis tilgjengelig
-    import spacy
-    try:
-        NLP = spacy.load("nb_core_news_sm")
-    except Exception:
-        NLP = None
-except ImportError:
-    NLP = None
+from text_index import (
+    FuzzyIndex, PhraseMatcher, VocabCorrector,
+    bounded_distance, edit_distance, token_aligned,
+)
+from translation import translate, translate_async, translate_many, translate_many_async, warmup_translator
+from reply_translations import DEFAULT_PATH as REPLY_TABLE_PATH, load_reply_table
+from texts_source import TEXT_NAMES, TextsWatcher, load_texts, texts_path
+
+from intent_model import compile_intent_model, load_intent_model, train_intent_model, training_hash
+from metrics import counter, gauge_lines, histogram, register_collector, timed
+from rule_engine import Rule, RuleEngine
+
+# ===================== METRIKKER =====================
+# tid pr. steg i handle_message og hvilken gren i get_intent som avgjorde.
+# Steg: lang_detect, translate_in, intent (inkl. cache), autocorrect, rules
+# (regel-tabellen, inkl. ml når den kjøres der), ml, ml_batch, reply, translate_out.
+
+STAGE_SECONDS = histogram("chatbot_stage_seconds", "Tid brukt pr. steg i handle_message.", ("stage",))
+INTENT_BRANCHES = counter("chatbot_intent_branch_total", "Hvilken gren i get_intent som ga svaret.", ("branch",))
+INTENTS = counter("chatbot_intent_total", "Intents som er returnert.", ("intent",))
+
+# ===================== LAT LASTING =====================
+# spaCy, intent-modellen (scikit-learn) og oversetteren lastes først når de
+# trengs, så import av modulen er rask. warmup() laster alt på forhånd.
+
+# sekunder brukt pr. steg: "import", "spacy", "intent_model", "translator"
+STARTUP_TIMINGS: dict[str, float] = {}
+
+# RLock: trening av modellen kaller ml_preprocess -> get_nlp under låsen
+_LAZY_LOCK = threading.RLock()
+
+NLP = None          # spaCy-pipeline, eller None hvis spaCy/modellen mangler
+_NLP_LOADED = False
+
+
+def get_nlp():
+    """spaCy (nb_core_news_sm) hvis tilgjengelig, ellers None. Lastes ved første kall."""
+    global NLP, _NLP_LOADED
+    if not _NLP_LOADED:
+        with _LAZY_LOCK:
+            if not _NLP_LOADED:
+                t0 = time.perf_counter()
+                try:  # spaCy er valgfritt – brukes hvis tilgjengelig
+                    import spacy
+                    NLP = spacy.load("nb_core_news_sm")
+                except Exception:
+                    NLP = None
+                STARTUP_TIMINGS["spacy"] = time.perf_counter() - t0
+                _NLP_LOADED = True
+    return NLP
 
 
 # ===================== TEKST-HJELPERE =====================
 
+_NON_WORD_RE = re.compile(r"[^a-z0-9æøåäöüßñç\s]", flags=re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
 def norm(s: str) -> str:
     """Rens og normaliser tekst."""
     if not s:
         return ""
     s = s.lower()
-    s = unicodedata.normalize("NFD", s)
-    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-    s = re.sub(r"[^a-z0-9æøåäöüßñç\s]", " ", s, flags=re.IGNORECASE)
-    s = re.sub(r"\s+", " ", s).strip()
+    # ren ASCII har ingen aksenter – hopp over unicodedata helt
+    if not s.isascii():
+        s = unicodedata.normalize("NFD", s)
+        s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+    s = _NON_WORD_RE.sub(" ", s)
+    s = _SPACE_RE.sub(" ", s).strip()
     return s
 
 
 def levenshtein(a: str, b: str) -> int:
-    a = norm(a)
-    b = norm(b)
-    if a == b:
-        return 0
-    if not a:
-        return len(b)
-    if not b:
-        return len(a)
-
-    dp = list(range(len(b) + 1))
-    for i in range(1, len(a) + 1):
-        prev = i - 1
-        cur = i
-        for j in range(1, len(b) + 1):
-            temp = dp[j]
-            dp[j] = min(
-                dp[j] + 1,
-                cur + 1,
-                prev + (0 if a[i - 1] == b[j - 1] else 1),
-            )
-            prev = temp
-            cur = dp[j]
-    return dp[len(b)]
+    return edit_distance(norm(a), norm(b))
 
 
-def fuzzy_includes(text: str, keywords, max_dist: int = 2) -> bool:
-    """True hvis text inneholder et av keywords-ish."""
+def levenshtein_bounded(a: str, b: str, max_dist: int, normalized: bool = False) -> int:
+    """
+    Som levenshtein, men for "er avstanden <= max_dist?"-spørsmål:
+    returnerer avstanden hvis den er <= max_dist, ellers max_dist + 1.
+    normalized=True hopper over norm() når kallet allerede har normalisert tekst.
+    """
+    if not normalized:
+        a = norm(a)
+        b = norm(b)
+    return bounded_distance(a, b, max_dist)
+
+
+# forhåndsbygde indekser, én pr. (ordliste, max_dist)
+_FUZZY_INDEXES: dict[tuple, FuzzyIndex] = {}
+
+def fuzzy_index(keywords, max_dist: int = 2) -> FuzzyIndex:
+    """Hent (eller bygg) en FuzzyIndex for en ordliste."""
+    key = (tuple(keywords), max_dist)
+    index = _FUZZY_INDEXES.get(key)
+    if index is None:
+        index = FuzzyIndex([norm(kw) for kw in keywords], max_dist)
+        _FUZZY_INDEXES[key] = index
+    return index
+
+
+def fuzzy_includes(text, keywords, max_dist: int = 2) -> bool:
+    """True hvis text inneholder et av keywords-ish.
+    text kan være str eller Message, keywords en ordliste eller en ferdig FuzzyIndex."""
+    if not isinstance(keywords, FuzzyIndex):
+        keywords = fuzzy_index(keywords, max_dist)
+    if isinstance(text, Message):
+        phrases = text.phrases if keywords in _PHRASE_INDEXES else None
+        return keywords.search(text.norm, text.tokens, phrases)
     t = norm(text)
-    tokens = t.split()
-    for kw in keywords:
-        k = norm(kw)
-        if not k:
-            continue
-        if k in t:
-            return True
-        for tok in tokens:
-            allowed = min(max_dist, max(1, len(k) // 3))
-            if levenshtein(tok, k) <= allowed:
-                return True
-    return False
+    return keywords.search(t, t.split())
+
+
+# ordlistene get_intent & co. bruker – bygges én gang ved import
+FZ_YES = fuzzy_index(YES_WORDS, 1)
+FZ_NO = fuzzy_index(NO_WORDS, 1)
+FZ_GREET = fuzzy_index(GREET_WORDS, 1)
+FZ_THANK = fuzzy_index(THANK_WORDS, 1)
+FZ_DOMAIN = fuzzy_index(DOMAIN_WORDS, 1)
+FZ_ADMIN = fuzzy_index(ADMIN_WORDS, 1)
+FZ_RELEASE = fuzzy_index(RELEASE_WORDS, 1)
+FZ_RELEASE_QUESTION = fuzzy_index(RELEASE_QUESTION_WORDS, 2)
+FZ_GAMEPLAY = fuzzy_index(GAMEPLAY_WORDS, 2)
+FZ_WHAT_IS_VINTRA = fuzzy_index(WHAT_IS_VINTRA_WORDS, 2)
+FZ_WHAT_IS_VOTE = fuzzy_index(WHAT_IS_VOTE_WORDS, 2)
+FZ_TEAM = fuzzy_index(TEAM_WORDS, 2)
+FZ_PRICE = fuzzy_index(PRICE_WORDS, 2)
+FZ_SUPPORT = fuzzy_index(SUPPORT_WORDS, 2)
+FZ_FOLLOWUP_WHAT = fuzzy_index(FOLLOWUP_WHAT_WORDS, 2)
+FZ_FOLLOWUP_WHO = fuzzy_index(FOLLOWUP_WHO_WORDS, 2)
+
+# indeks -> ordlisten den er bygget fra (reload_texts bygger bare de endrede på nytt)
+_FUZZY_SOURCES = {
+    "FZ_YES": "YES_WORDS",
+    "FZ_NO": "NO_WORDS",
+    "FZ_GREET": "GREET_WORDS",
+    "FZ_THANK": "THANK_WORDS",
+    "FZ_DOMAIN": "DOMAIN_WORDS",
+    "FZ_ADMIN": "ADMIN_WORDS",
+    "FZ_RELEASE": "RELEASE_WORDS",
+    "FZ_RELEASE_QUESTION": "RELEASE_QUESTION_WORDS",
+    "FZ_GAMEPLAY": "GAMEPLAY_WORDS",
+    "FZ_WHAT_IS_VINTRA": "WHAT_IS_VINTRA_WORDS",
+    "FZ_WHAT_IS_VOTE": "WHAT_IS_VOTE_WORDS",
+    "FZ_TEAM": "TEAM_WORDS",
+    "FZ_PRICE": "PRICE_WORDS",
+    "FZ_SUPPORT": "SUPPORT_WORDS",
+    "FZ_FOLLOWUP_WHAT": "FOLLOWUP_WHAT_WORDS",
+    "FZ_FOLLOWUP_WHO": "FOLLOWUP_WHO_WORDS",
+}
+
+
+# ===================== FRASE-AUTOMAT =====================
+
+# Én automat over alle faste fraser: KEYWORD_TAGS-nøklene, alle ordlistene
+# over og mengde-ordene for team-størrelse. parse_message kjører den én gang
+# pr. melding, og tags + substreng-treff leses derfra.
+def _build_phrase_matcher(keyword_tags, indexes, team_size_words) -> PhraseMatcher:
+    matcher = PhraseMatcher()
+    for key in keyword_tags:
+        matcher.add(key)
+    for index in indexes:
+        for key in index.keywords:
+            matcher.add(key)
+    for key in team_size_words:
+        matcher.add(key)
+    matcher.build()
+    return matcher
+
+
+PHRASE_MATCHER = _build_phrase_matcher(KEYWORD_TAGS, _FUZZY_INDEXES.values(), TEAM_SIZE_WORDS)
+
+# indekser som automaten dekker (andre faller tilbake til vanlig substreng-søk)
+_PHRASE_INDEXES = set(_FUZZY_INDEXES.values())
+
+TEAM_SIZE_PHRASES = frozenset(TEAM_SIZE_WORDS)
+
+
+def match_phrases(n: str) -> list[tuple[int, int, str]]:
+    """Alle fraser i normalisert tekst n, som (start, slutt, frase)."""
+    return PHRASE_MATCHER.scan(n)
+
+
+def keyword_tags(n: str, spans) -> set[str]:
+    """Tags for KEYWORD_TAGS-nøkler som treffer hele ord (uansett antall ord)."""
+    return {
+        KEYWORD_TAGS[p]
+        for start, end, p in spans
+        if p in KEYWORD_TAGS and token_aligned(n, start, end)
+    }
 
 
 # ===================== EMOJI =====================
@@ -112,147 +236,310 @@ def has_any_emoji(text: str) -> bool:
     return bool(EMOJI_RE.search(text or ""))
 
 
+# ===================== MELDING (normaliseres én gang) =====================
+
+@dataclass(frozen=True, slots=True)
+class Message:
+    """
+    Én melding, ferdig analysert. Lages én gang pr. tekst i en runde,
+    og alle stegene under leser herfra i stedet for å kjøre norm() på nytt.
+    """
+    raw: str
+    norm: str
+    tokens: tuple[str, ...]
+    phrases: frozenset[str]   # alle faste fraser som finnes i norm (substreng)
+    tags: frozenset[str]      # KEYWORD_TAGS-tags for hele ord/fraser
+    has_emoji: bool
+    emoji_only: bool
+    is_question: bool
+
+
+def parse_message(text: str, normalized: str | None = None) -> Message:
+    """Bygg en Message. normalized kan sendes inn hvis norm(text) allerede er kjent."""
+    raw = text or ""
+    n = norm(raw) if normalized is None else normalized
+    tokens = tuple(n.split())
+    spans = match_phrases(n)
+    return Message(
+        raw=raw,
+        norm=n,
+        tokens=tokens,
+        phrases=frozenset(p for _, _, p in spans),
+        tags=frozenset(keyword_tags(n, spans)),
+        has_emoji=has_any_emoji(raw),
+        emoji_only=is_emoji_only(raw),
+        is_question="?" in raw or any(w in QUESTION_WORDS for w in tokens),
+    )
+
+
+def as_message(text) -> Message:
+    """Godta både str og Message – så gamle kall med ren tekst fortsatt virker."""
+    if isinstance(text, Message):
+        return text
+    return parse_message(text)
+
+
 # ===================== KEYWORDS / STIKKORD =====================
 
-def extract_keywords(text: str):
+def extract_keywords(text):
     """
     Returnerer:
       tags: sett med tags (f.eks {'domain','price'})
       tokens: liste med normaliserte ord
       is_question: True hvis det ser ut som et spørsmål
     """
-    n = norm(text)
-    tokens = n.split()
-    tags = set()
+    msg = as_message(text)
+    return set(msg.tags), list(msg.tokens), msg.is_question
 
-    for i, tok in enumerate(tokens):
-        if tok in KEYWORD_TAGS:
-            tags.add(KEYWORD_TAGS[tok])
 
-        if i < len(tokens) - 1:
-            pair = tok + " " + tokens[i + 1]
-            if pair in KEYWORD_TAGS:
-                tags.add(KEYWORD_TAGS[pair])
+# ===================== SPRÅKDETEKSJON (ordliste med vekter) =====================
 
-    is_q = "?" in text or any(w in tokens for w in QUESTION_WORDS)
-    return tags, tokens, is_q
+# prioritet ved likt poeng; engelsk er fallback når ingenting treffer
+LANG_ORDER = tuple(LANG_HINT_WORDS) + ("en",)
 
+def _build_lang_lexicon(hints) -> dict[str, dict[str, float]]:
+    """
+    token -> {språk: vekt}. Et ord som finnes i k språk gir 1/k til hvert,
+    men norsk (internt språk) får alltid full vekt – et delt ord skal ikke
+    sende en norsk melding via oversetteren.
+    """
+    langs_for: dict[str, list[str]] = {}
+    for lang, words in hints.items():
+        for w in words:
+            langs_for.setdefault(norm(w), []).append(lang)
+    return {
+        tok: {lang: 1.0 if lang == "no" else 1.0 / len(langs) for lang in langs}
+        for tok, langs in langs_for.items()
+    }
 
-# ===================== SPRÅKDETeksjon (regex-baserT) =====================
+LANG_LEXICON = _build_lang_lexicon(LANG_HINT_WORDS)
 
-def detect_lang_rule(text: str) -> str:
-    """Grovt språk-gjett basert på regex-mønstre."""
-    raw = text or ""
-    lower = raw.lower()
-    n = norm(text)
+_NORWEGIAN_CHARS_RE = re.compile(r"[æøå]")
+_DOMAIN_WORD_RE = re.compile(r"\b(vote|vintra)\b")
+
+
+def detect_lang_scores(text) -> dict[str, float]:
+    """Poeng for hvert språk i LANG_ORDER – ett pass over tokenene."""
+    msg = as_message(text)
+    scores = dict.fromkeys(LANG_ORDER, 0.0)
+    lower = msg.raw.lower()
+
+    # norsk – æøå
+    if _NORWEGIAN_CHARS_RE.search(lower):
+        scores["no"] += 1.0
+
+    question_word = False
+    for tok in msg.tokens:
+        hit = LANG_LEXICON.get(tok)
+        if hit:
+            for lang, weight in hit.items():
+                scores[lang] += weight
+        if tok in QUESTION_WORDS:
+            question_word = True
 
-    # KEYWORDS: hvis setningen handler om vote/vintra OG har et typisk norsk ord,
+    # hvis setningen handler om vote/vintra OG har et norsk spørreord,
     # behandl det som norsk (så vi slipper å oversette bort "vote").
-    if re.search(r"\b(vote|vintra)\b", lower) and re.search(
-        r"\b(hva|hvor|hvem|hvordan|hvorfor|når)\b", n
-    ):
-        return "no"
-
-    # norsk – æøå eller typiske norske ord / spørreord
-    if re.search(r"[æøå]", lower):
-        return "no"
-    if re.search(r"\b(hva|hvor|hvem|hvordan|hvorfor|når|hei|pris|billett|støtte|hjelp|ticket)\b", n):
-        return "no"
-
-    if re.search(r"\b(hej|hvordan|pris|billet|støtte)\b", n):
-        return "da"
-    if re.search(r"\b(hej|pris|stöd|biljett)\b", n):
-        return "sv"
-    if re.search(r"\b(hola|precio|ayuda|soporte|ticket)\b", n):
-        return "es"
-    if re.search(r"\b(bonjour|prix|aide|billet|support)\b", n):
-        return "fr"
-    if re.search(r"\b(hallo|preis|hilfe|ticket|unterstützung)\b", n):
-        return "de"
-    if re.search(r"\b(moi|hinta|lippu|tuki)\b", n):
-        return "fi"
-
-    return "en"
+    if question_word and _DOMAIN_WORD_RE.search(lower):
+        scores["no"] += 1.0
+
+    return scores
+
+
+def best_lang(scores: dict[str, float]) -> str:
+    """Språket med høyest poeng (først i LANG_ORDER ved likt), ellers engelsk."""
+    best, best_score = "en", 0.0
+    for lang in LANG_ORDER:
+        if scores.get(lang, 0.0) > best_score:
+            best, best_score = lang, scores[lang]
+    return best
+
+
+def detect_lang_rule(text) -> str:
+    """Grovt språk-gjett basert på vektede ordlister."""
+    return best_lang(detect_lang_scores(text))
 
 
 # ===================== DOMAIN-RELASJON =====================
 
-def is_domain_related(text: str) -> bool:
+def is_domain_related(text) -> bool:
+    msg = as_message(text)
     return (
-        fuzzy_includes(text, DOMAIN_WORDS, 1)
-        or fuzzy_includes(text, GREET_WORDS, 1)
-        or is_emoji_only(text)
-        or has_any_emoji(text)
+        fuzzy_includes(msg, FZ_DOMAIN)
+        or fuzzy_includes(msg, FZ_GREET)
+        or msg.emoji_only
+        or msg.has_emoji
     )
 
 
 # ===================== AUTOCORRECT =====================
 
-# Ord vi prøver å "rette" til ved stavefeil.
-AUTOCORRECT_VOCAB = set(KEYWORD_TAGS.keys()) | set(QUESTION_WORDS) | set(DOMAIN_WORDS) | {
+# Ord vi prøver å "rette" til ved stavefeil (i tillegg til tags, spørreord og domene-ord).
+_AUTOCORRECT_EXTRA = {
     "er", "vil", "team", "stort", "mange", "stor", "størrelse",
     "gameplay", "pris", "lansering", "hjelp", "support", "ticket", "sak",
 }
 
-def autocorrect_text(text: str) -> str:
+def _build_autocorrect(keyword_tags, question_words, domain_words):
+    """(vokabular, {ord: norm(ord)}, VocabCorrector) – normaliseres én gang, ikke for hvert token."""
+    vocab = set(keyword_tags.keys()) | set(question_words) | set(domain_words) | _AUTOCORRECT_EXTRA
+    normed = {w: norm(w) for w in vocab}
+    return vocab, normed, VocabCorrector(list(normed.items()))
+
+
+AUTOCORRECT_VOCAB, _AUTOCORRECT_NORMED, AUTOCORRECT_INDEX = _build_autocorrect(
+    KEYWORD_TAGS, QUESTION_WORDS, DOMAIN_WORDS
+)
+
+def autocorrect_message(msg: Message) -> Message:
     """
     Grov stavekorreksjon: finner nærmeste ord i AUTOCORRECT_VOCAB
     hvis avstanden er liten nok.
     Eksempel: 'hvirdan' -> 'hvordan', 'gameplayte' -> 'gameplay'.
+    Returnerer en ny Message; den normaliserte formen settes sammen av
+    allerede normaliserte ord, så norm() trengs ikke en gang til.
     """
-    n = norm(text)
-    tokens = n.split()
+    with timed(STAGE_SECONDS, "autocorrect"):
+        return _autocorrect(msg)
+
+
+def _autocorrect(msg: Message) -> Message:
     corrected = []
+    normed = []
+
+    for tok in msg.tokens:
+        # tillat små feil – strengere på korte ord (kortere enn 4 rettes aldri)
+        if len(tok) >= 6:
+            allowed = 2
+        elif len(tok) >= 4:
+            allowed = 1
+        else:
+            allowed = 0
 
-    for tok in tokens:
-        best = tok
-        best_dist = 999
-
-        for cand in AUTOCORRECT_VOCAB:
-            d = levenshtein(tok, cand)
-            if d < best_dist:
-                best_dist = d
-                best = cand
-
-        # tillat små feil – strengere på korte ord
-        if best != tok and (
-            (len(tok) >= 6 and best_dist <= 2) or
-            (4 <= len(tok) < 6 and best_dist <= 1)
-        ):
-            corrected.append(best)
+        hit = AUTOCORRECT_INDEX.nearest(tok, allowed) if allowed else None
+        if hit is not None and hit[0] != tok:
+            corrected.append(hit[0])
+            normed.append(_AUTOCORRECT_NORMED[hit[0]])
         else:
             corrected.append(tok)
+            normed.append(tok)
+
+    return parse_message(" ".join(corrected), " ".join(normed))
 
-    return " ".join(corrected)
+
+def autocorrect_text(text) -> str:
+    """Som autocorrect_message, men tar og gir ren tekst."""
+    return autocorrect_message(as_message(text)).raw
 
 
 # ===================== STATE =====================
 
-@dataclass
+# faste verdier for feltene i ChatState. Indeksen er koden i to_bytes(),
+# og alle sesjoner peker på de samme str-objektene. Kodene lagres (SQLite-
+# sesjoner), så nye verdier legges BARE til bakerst – aldri flytt eller fjern.
+# Språkkodene er bevisst uavhengige av rekkefølgen i LANG_HINT_WORDS (den er
+# prioritet ved likt poeng og kan endres fritt).
+VIEW_VALUES = (None, "createTicket")
+TOPIC_VALUES = (None, "vote")
+LANG_VALUES = (None, "no", "da", "sv", "es", "fr", "de", "fi", "en")
+
+_VIEW_CODES = {v: i for i, v in enumerate(VIEW_VALUES)}
+_TOPIC_CODES = {v: i for i, v in enumerate(TOPIC_VALUES)}
+_LANG_CODES = {v: i for i, v in enumerate(LANG_VALUES)}
+
+LANG_HISTORY_SIZE = 8     # bare de siste språkvalgene huskes
+_STATE_FORMAT = 1
+
+
+def _code(codes: dict, value, field: str) -> int:
+    try:
+        return codes[value]
+    except KeyError:
+        raise ValueError(f"ChatState.{field}: ukjent verdi {value!r}") from None
+
+
+def _value(values: tuple, code: int, field: str):
+    if code >= len(values):
+        raise ValueError(f"ChatState.{field}: ukjent kode {code}")
+    return values[code]
+
+
+def _check_langs(langs) -> None:
+    """ValueError hvis et språk ikke har en kode i LANG_VALUES."""
+    unknown = [lang for lang in langs if lang not in _LANG_CODES]
+    if unknown:
+        raise ValueError(
+            f"språk uten kode i LANG_VALUES: {', '.join(unknown)} (legg dem til bakerst der)"
+        )
+
+
+_check_langs(LANG_ORDER)
+
+
+@dataclass(slots=True)
 class ChatState:
-    """State per bruker/konversasjon."""
+    """
+    State per bruker/konversasjon. Slotted og kompakt, siden vi kan ha
+    veldig mange samtidige sesjoner: språkhistorikken er en ringbuffer med
+    de siste LANG_HISTORY_SIZE språkkodene (én byte hver).
+    """
     awaiting_ticket_confirm: bool = False
     active_view: str | None = None
     last_topic: str | None = None
     user_lang: str | None = None   # språket vi tror brukeren bruker
-    lang_history: list[str] = None # husk siste språkvalg
-
-    def __post_init__(self):
-        if self.lang_history is None:
-            self.lang_history = []
-
-
-def pick_lang_for_message(text: str, state: ChatState) -> str:
+    lang_codes: bytes = b""        # siste språkvalg, koder i LANG_VALUES
+
+    @property
+    def lang_history(self) -> tuple[str, ...]:
+        """De siste språkvalgene, eldst først. Skrivebeskyttet – bruk remember_lang()."""
+        return tuple(LANG_VALUES[c] for c in self.lang_codes)
+
+    def remember_lang(self, lang: str) -> None:
+        codes = self.lang_codes + bytes((_code(_LANG_CODES, lang, "lang_history"),))
+        self.lang_codes = codes[-LANG_HISTORY_SIZE:]
+
+    def to_bytes(self) -> bytes:
+        """
+        Binær form: format, flagg, view, topic, språk, så historikken.
+        Typisk 5–13 bytes. ValueError hvis et felt har en ukjent verdi.
+        """
+        return bytes((
+            _STATE_FORMAT,
+            int(self.awaiting_ticket_confirm),
+            _code(_VIEW_CODES, self.active_view, "active_view"),
+            _code(_TOPIC_CODES, self.last_topic, "last_topic"),
+            _code(_LANG_CODES, self.user_lang, "user_lang"),
+        )) + self.lang_codes
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ChatState":
+        """Motsatt av to_bytes(). ValueError ved ukjent format eller kode."""
+        if len(data) < 5 or data[0] != _STATE_FORMAT:
+            raise ValueError("ChatState.from_bytes: ukjent format")
+        lang_codes = bytes(data[5:5 + LANG_HISTORY_SIZE])
+        for c in lang_codes:
+            _value(LANG_VALUES, c, "lang_history")
+        return cls(
+            awaiting_ticket_confirm=bool(data[1]),
+            active_view=_value(VIEW_VALUES, data[2], "active_view"),
+            last_topic=_value(TOPIC_VALUES, data[3], "last_topic"),
+            user_lang=_value(LANG_VALUES, data[4], "user_lang"),
+            lang_codes=lang_codes,
+        )
+
+
+def pick_lang_for_message(text, state: ChatState) -> str:
     """
     Velg språk basert på:
-    - regex-baserte regler (detect_lang_rule)
+    - poeng pr. språk (detect_lang_scores)
     - tidligere språk (state.user_lang + history)
     - ikke bytt bare på en kort, tvetydig hilsen
+    - ikke bytt hvis forrige språk scorer like høyt som det nye
     """
-    detected = detect_lang_rule(text)
-    n = norm(text)
-    tokens = n.split()
-    token_count = len(tokens)
+    msg = as_message(text)
+    scores = detect_lang_scores(msg)
+    detected = best_lang(scores)
+    n = msg.norm
+    token_count = len(msg.tokens)
 
     # Hvis dette er første melding og det er en tvetydig hilsen, anta norsk
     if state.user_lang is None:
@@ -260,68 +547,120 @@ def pick_lang_for_message(text: str, state: ChatState) -> str:
             state.user_lang = "no"
         else:
             state.user_lang = detected
-        state.lang_history.append(state.user_lang)
+        state.remember_lang(state.user_lang)
         return state.user_lang
 
     # Hvis vi har brukt samme språk flere ganger på rad, gi det litt "tyngde"
     recent_lang = state.user_lang
     if detected == recent_lang:
-        state.lang_history.append(detected)
+        state.remember_lang(detected)
         return detected
 
     # kort og tvetydig -> behold forrige
     if token_count <= 2 and n in AMBIGUOUS_GREETINGS:
-        state.lang_history.append(recent_lang)
+        state.remember_lang(recent_lang)
+        return recent_lang
+
+    # like sterke hint for forrige språk (f.eks. "pris" på dansk) -> behold forrige
+    if scores.get(recent_lang, 0.0) > 0 and scores[recent_lang] >= scores[detected]:
+        state.remember_lang(recent_lang)
         return recent_lang
 
     # ellers: bytt til det nye språket
     state.user_lang = detected
-    state.lang_history.append(detected)
+    state.remember_lang(detected)
     return detected
 
 
 # ===================== ML-INTENT (TFIDF + LOGISTIC REGRESSION) =====================
 
-def ml_preprocess(text: str) -> str:
+def ml_preprocess(text) -> str:
     """Tekst-preprosessering for ML. Bruker spaCy hvis tilgjengelig, ellers norm()."""
+    nlp = get_nlp()
+    if isinstance(text, Message):
+        if nlp is None:
+            return text.norm
+        text = text.raw
     if not text:
         return ""
-    if NLP is None:
+    if nlp is None:
         return norm(text)
-    doc = NLP(text.lower())
+    doc = nlp(text.lower())
     tokens = [t.lemma_ for t in doc if not t.is_space and not t.is_punct]
     return " ".join(tokens)
 
 
+def ml_preprocess_id() -> str:
+    """Hvilken preprosessering modellen er trent med – en del av modell-hashen."""
+    return "spacy:nb_core_news_sm" if get_nlp() is not None else "norm"
+
+
+# fylles inn av ensure_intent_model() ved første bruk
+ML_PREPROCESS_ID = None
+ML_DATA_HASH = None
 ML_VECTORIZER = None
 ML_CLASSIFIER = None
-
-def _train_intent_classifier():
-    global ML_VECTORIZER, ML_CLASSIFIER
-    if TfidfVectorizer is None or LogisticRegression is None:
-        ML_VECTORIZER = None
-        ML_CLASSIFIER = None
-        return
-    texts = [ml_preprocess(t) for t, _ in ML_TRAIN_DATA]
-    labels = [intent for _, intent in ML_TRAIN_DATA]
-    ML_VECTORIZER = TfidfVectorizer(ngram_range=(1, 2), min_df=1)
-    X = ML_VECTORIZER.fit_transform(texts)
-    ML_CLASSIFIER = LogisticRegression(max_iter=1000)
-    ML_CLASSIFIER.fit(X, labels)
-
-try:
-    _train_intent_classifier()
-except Exception:
-    ML_VECTORIZER = None
-    ML_CLASSIFIER = None
-
-
-def ml_predict_intent(text_no: str, threshold: float = 0.7) -> str | None:
+ML_ENGINE = None        # CompiledIntentModel – raskt enkelt-meldings-oppslag
+ML_MODEL_SOURCE = None  # "artifact" | "trained" | None
+_ML_LOADED = False
+
+def _build_intent_model(train_data) -> dict:
+    """ML_*-verdiene for train_data: intent_model.joblib hvis den matcher, ellers tren her og nå."""
+    preprocess_id = ml_preprocess_id()
+    data_hash = training_hash(train_data, preprocess_id)
+    loaded = load_intent_model(data_hash)
+    if loaded is not None:
+        vectorizer, classifier = loaded
+        source = "artifact"
+    else:
+        vectorizer, classifier = train_intent_model(train_data, ml_preprocess)
+        source = "trained" if classifier is not None else None
+    return {
+        "ML_PREPROCESS_ID": preprocess_id,
+        "ML_DATA_HASH": data_hash,
+        "ML_VECTORIZER": vectorizer,
+        "ML_CLASSIFIER": classifier,
+        "ML_ENGINE": compile_intent_model(vectorizer, classifier),
+        "ML_MODEL_SOURCE": source,
+    }
+
+
+def _load_intent_classifier():
+    globals().update(_build_intent_model(ML_TRAIN_DATA))
+
+
+def ensure_intent_model() -> bool:
+    """Last/tren intent-modellen ved første kall. True hvis vi har en modell."""
+    global ML_VECTORIZER, ML_CLASSIFIER, ML_ENGINE, ML_MODEL_SOURCE, _ML_LOADED
+    if not _ML_LOADED:
+        with _LAZY_LOCK:
+            if not _ML_LOADED:
+                t0 = time.perf_counter()
+                try:
+                    _load_intent_classifier()
+                except Exception:
+                    ML_VECTORIZER = None
+                    ML_CLASSIFIER = None
+                    ML_ENGINE = None
+                    ML_MODEL_SOURCE = None
+                STARTUP_TIMINGS["intent_model"] = time.perf_counter() - t0
+                _ML_LOADED = True
+    return ML_CLASSIFIER is not None
+
+
+def ml_predict_intent(text_no, threshold: float = 0.7) -> str | None:
     """Bruk ML-modellen til å foreslå intent. Returnerer None hvis usikker."""
-    if not ML_CLASSIFIER or not ML_VECTORIZER or not text_no:
+    if not ensure_intent_model() or not ML_CLASSIFIER or not ML_VECTORIZER:
         return None
-    X = ML_VECTORIZER.transform([ml_preprocess(text_no)])
-    probs = ML_CLASSIFIER.predict_proba(X)[0]
+    if not (text_no.raw if isinstance(text_no, Message) else text_no):
+        return None
+    with timed(STAGE_SECONDS, "ml"):
+        if ML_ENGINE is not None:
+            # kompilert vei: bare de aktive n-grammene, ingen sparse-matriser
+            probs = ML_ENGINE.predict_proba(ml_preprocess(text_no))
+        else:
+            X = ML_VECTORIZER.transform([ml_preprocess(text_no)])
+            probs = ML_CLASSIFIER.predict_proba(X)[0]
     labels = ML_CLASSIFIER.classes_
     best_idx = probs.argmax()
     best_label = labels[best_idx]
@@ -331,228 +670,332 @@ def ml_predict_intent(text_no: str, threshold: float = 0.7) -> str | None:
     return None
 
 
+def ml_preprocess_batch(texts) -> list[str]:
+    """Som ml_preprocess for mange tekster – spaCy kjøres med nlp.pipe."""
+    nlp = get_nlp()
+    if nlp is None:
+        return [ml_preprocess(t) for t in texts]
+    raws = [t.raw if isinstance(t, Message) else (t or "") for t in texts]
+    out = [""] * len(raws)
+    todo = [i for i, raw in enumerate(raws) if raw]
+    for i, doc in zip(todo, nlp.pipe(raws[i].lower() for i in todo)):
+        out[i] = " ".join(tok.lemma_ for tok in doc if not tok.is_space and not tok.is_punct)
+    return out
+
+
+def ml_predict_intent_batch(texts, threshold: float = 0.7) -> list[str | None]:
+    """Som ml_predict_intent for mange tekster, med én transform/predict_proba for alle."""
+    results: list[str | None] = [None] * len(texts)
+    if not ensure_intent_model() or not ML_CLASSIFIER or not ML_VECTORIZER:
+        return results
+    todo = [
+        i for i, t in enumerate(texts)
+        if (t.raw if isinstance(t, Message) else t)
+    ]
+    if not todo:
+        return results
+
+    # like tekster klassifiseres bare én gang
+    with timed(STAGE_SECONDS, "ml_batch"):
+        prepped = ml_preprocess_batch([texts[i] for i in todo])
+        unique = list(dict.fromkeys(prepped))
+        probs = ML_CLASSIFIER.predict_proba(ML_VECTORIZER.transform(unique))
+    labels = ML_CLASSIFIER.classes_
+    by_text = {}
+    for text, row in zip(unique, probs):
+        best_idx = row.argmax()
+        by_text[text] = labels[best_idx] if row[best_idx] >= threshold else None
+    for i, text in zip(todo, prepped):
+        results[i] = by_text[text]
+    return results
+
+
+# ===================== INTENT-CACHE =====================
+# Intent er en ren funksjon av norm(text_no) (stavekorreksjonen bygger meldingen
+# på nytt fra de normaliserte ordene) og to state-felt. Så like meldinger –
+# "hei", "takk", "hva koster spillet" – trenger bare å gå gjennom reglene én gang.
+
+# ordlistene reglene i get_intent bygger på
+_RULE_TEXTS = (
+    "KEYWORD_TAGS", "QUESTION_WORDS",
+    "YES_WORDS", "NO_WORDS", "THANK_WORDS", "GREET_WORDS", "FAREWELL_WORDS",
+    "ADMIN_WORDS", "RELEASE_WORDS", "RELEASE_QUESTION_WORDS",
+    "GAMEPLAY_WORDS", "DOMAIN_WORDS", "TEAM_SIZE_WORDS",
+    "WHAT_IS_VINTRA_WORDS", "WHAT_IS_VOTE_WORDS", "TEAM_WORDS",
+    "PRICE_WORDS", "SUPPORT_WORDS", "FOLLOWUP_WHAT_WORDS", "FOLLOWUP_WHO_WORDS",
+)
+
+def _rules_hash(texts=None) -> str:
+    """Hash av ordlistene i _RULE_TEXTS (fra texts, ellers de som er i bruk nå)."""
+    texts = globals() if texts is None else texts
+    payload = json.dumps([texts[name] for name in _RULE_TEXTS], ensure_ascii=False, default=sorted)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+RULES_HASH = _rules_hash()
+
+
+class IntentCache:
+    """
+    LRU (norm, awaiting_ticket_confirm, last_topic) -> (intent, gren).
+    Grenen lagres med, så metrikkene viser hvilken regel som ga svaret også
+    ved treff (treffraten står i stats()). Hver verdi hører til en versjon (ordlister + modell); er versjonen en
+    annen enn sist, tømmes cachen før oppslaget. max_entries=0 slår den av.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[str, str]] = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: tuple, version) -> tuple[str, str] | None:
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: tuple[str, str], version) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+INTENT_CACHE = IntentCache(int(os.environ.get("INTENT_CACHE_SIZE", 10_000)))
+
+
+def _intent_cache_metrics() -> list[str]:
+    stats = INTENT_CACHE.stats()
+    return (
+        gauge_lines("chatbot_intent_cache_entries", "Antall intents i cachen.", stats["size"])
+        + gauge_lines("chatbot_intent_cache_hits_total", "Treff i intent-cachen.", stats["hits"], "counter")
+        + gauge_lines("chatbot_intent_cache_misses_total", "Bom i intent-cachen.", stats["misses"], "counter")
+    )
+
+
+register_collector(_intent_cache_metrics)
+
+
+def intent_cache_version() -> tuple:
+    """Endres når ordlistene eller intent-modellen endres (nytt innhold eller ny lasting)."""
+    ensure_intent_model()
+    return (RULES_HASH, ML_DATA_HASH, ML_MODEL_SOURCE, id(ML_CLASSIFIER))
+
+
+def _memo_intent(n: str, state: ChatState, compute) -> str:
+    """Intent fra cachen, ellers compute() -> (gren, intent) (som så lagres)."""
+    with timed(STAGE_SECONDS, "intent"):
+        key = (n, state.awaiting_ticket_confirm, state.last_topic)
+        version = intent_cache_version()
+        entry = INTENT_CACHE.get(key, version)
+        if entry is None:
+            branch, intent = compute()
+            INTENT_CACHE.put(key, (intent, branch), version)
+        else:
+            intent, branch = entry
+    INTENT_BRANCHES.inc(branch)
+    INTENTS.inc(intent)
+    return intent
+
+
 # ===================== INTENT-DETEKSJON =====================
 
-def get_intent(text_no: str, state: ChatState) -> str:
+# markør for "ML er ikke kjørt ennå" (None betyr at modellen var usikker)
+_ML_LAZY = object()
+
+def get_intent(text_no, state: ChatState) -> str:
     """
-    text_no: meldingen oversatt til norsk (internt tekst).
+    text_no: meldingen oversatt til norsk (internt tekst), som str eller Message.
     1) stave-korriger tekst
     2) prioriter spesialtilfeller (vintra / team_size)
     3) prøv ML-modellen
     4) fallback til regelbasert logikk
+    Resultatet caches (INTENT_CACHE), så gjentatte meldinger er ett oppslag.
     """
-    orig = text_no or ""
-    # 1) grov stavekorreksjon
-    t = autocorrect_text(orig)
-    n = norm(t)
-
-    # hent tags/tokens/is_question med én gang – vi bruker dette flere steder
-    tags, tokens, is_question = extract_keywords(t)
-    token_count = len(tokens)
-
-    # 🔹 PRIORITERT: VINTRA-SPØRSMÅL (hva er vintra ...)
-    if fuzzy_includes(
-        t,
-        [
-            "hva er vintra",
-            "hva er vintra studio",
-            "om vintra",
-            "om vintra studio",
-        ],
-        max_dist=2,
-    ):
-        return "what_is_vintra"
-
-    # 🔹 PRIORITERT: TEAM-STØRRELSE – spørsmål + domain + mengde-ord
-    if "domain" in tags and (
-        "hvor mange" in n
-        or "hvor stort" in n
-        or "hvor stor er" in n
-        or "hvor stort er" in n
-        or "størrelse" in n
-    ):
-        return "team_size"
-
-    # 2) ML etter de viktigste spesialreglene
-    ml_intent = ml_predict_intent(t)
-    if ml_intent:
-        # Spesialtilfelle: hvis vi venter på ticket-bekreftelse, overstyr JA/NEI
-        if state.awaiting_ticket_confirm:
-            if fuzzy_includes(t, YES_WORDS, 1):
-                return "confirm_ticket_yes"
-            if fuzzy_includes(t, NO_WORDS, 1):
-                return "confirm_ticket_no"
-        # Ellers stoler vi på ML-forslaget (men lar off_topic håndteres av regler)
-        if ml_intent != "off_topic":
-            return ml_intent
-
-    # 3) REGELBASERT
-
-    # JA/NEI på ticket?
-    if state.awaiting_ticket_confirm and fuzzy_includes(t, YES_WORDS, 1):
-        return "confirm_ticket_yes"
-    if state.awaiting_ticket_confirm and fuzzy_includes(t, NO_WORDS, 1):
-        return "confirm_ticket_no"
-
-    # emoji
-    if is_emoji_only(t):
-        return "emoji_smalltalk"
-
-    # hilsen
-    if fuzzy_includes(t, GREET_WORDS, 1):
-        return "greeting"
+    # cache-nøkkelen trenger bare norm() – hele Message bygges først ved bom
+    if isinstance(text_no, Message):
+        n = text_no.norm
+        build = lambda: text_no
+    else:
+        n = norm(text_no)
+        build = lambda: parse_message(text_no, n)
+    # 1) grov stavekorreksjon – t er den rettede meldingen, alt under leser fra den
+    return _memo_intent(n, state, lambda: _decide_intent(autocorrect_message(build()), state))
+
 
+def _decide_intent(t: Message, state: ChatState, ml_intent=_ML_LAZY) -> tuple[str, str]:
+    """Regel-tabellen i get_intent: (gren, intent). ml_intent kan være forhåndsberegnet (batch)."""
+    with timed(STAGE_SECONDS, "rules"):
+        return INTENT_ENGINE.evaluate(_RuleContext(t, state, ml_intent))
+
+
+class _RuleContext:
+    """Det en feature kan lese: meldingen (etter autocorrect), state og ML-svaret."""
+    __slots__ = ("msg", "state", "_ml")
+
+    def __init__(self, msg: Message, state: ChatState, ml_intent=_ML_LAZY):
+        self.msg = msg
+        self.state = state
+        self._ml = ml_intent
+
+    @property
+    def ml(self) -> str | None:
+        # ML kjøres først når en regel spør – og høyst én gang
+        if self._ml is _ML_LAZY:
+            self._ml = ml_predict_intent(self.msg)
+        return self._ml
+
+
+_TICKET_PHRASE_RE = re.compile(
+    r"\b(jeg vil|ønsker|skal|trenger|må|kan du|kan jeg|jeg trenger)\b.*\b(support|støtte|ticket|sak|henvendelse|kundeservice|hjelp)\b"
+)
+_NOT_FRAGMENT = ("ticket", "support", "støtte", "pris", "price")
+
+# navn -> ctx -> bool. Ordlistene (FZ_* osv.) slås opp ved kall, ikke her.
+RULE_FEATURES = {
+    **{f"tag:{tag}": (lambda c, tag=tag: tag in c.msg.tags) for tag in set(KEYWORD_TAGS.values())},
+    "awaiting_ticket_confirm": lambda c: c.state.awaiting_ticket_confirm,
+    "last_topic_vote": lambda c: c.state.last_topic == "vote",
+    "ml_confident": lambda c: bool(c.ml) and c.ml != "off_topic",
+    "emoji_only": lambda c: c.msg.emoji_only,
+    "question": lambda c: c.msg.is_question,
+    "short": lambda c: len(c.msg.tokens) <= 3,
+    # "jeg"/"i" alene, eller ett ord som ikke selv er et ticket/pris-ord
+    "fragment": lambda c: c.msg.norm in ("jeg", "i") or (len(c.msg.tokens) == 1 and c.msg.norm not in _NOT_FRAGMENT),
     # farvel – IKKE fuzzy, ellers kan "mye" ligne på "bye"
-    if any(tok in FAREWELL_WORDS for tok in tokens):
-        return "farewell"
-
-    # takk
-    if fuzzy_includes(t, THANK_WORDS, 1):
-        return "thanks"
-
-    # fragment
-    if (
-        n in ("jeg", "i")
-        or (token_count == 1 and n not in ("ticket", "support", "støtte", "pris", "price"))
-    ):
-        return "fragment"
-
-    # --- ticket / support ---
-    if "ticket" in tags or "support" in tags:
-        if token_count <= 3:
-            return "ask_ticket"
-
-        if re.search(
-            r"\b(jeg vil|ønsker|skal|trenger|må|kan du|kan jeg|jeg trenger)\b.*\b(support|støtte|ticket|sak|henvendelse|kundeservice|hjelp)\b",
-            n,
-        ):
-            return "ask_ticket"
-
-    # --- gameplay ---
-    if "gameplay" in tags or fuzzy_includes(t, GAMEPLAY_WORDS, 2):
-        return "gameplay_info"
-
-    # --- nettsider / web ---
-    if "web_dev" in tags:
-        return "web_dev_info"
-
-    # --- pris ---
-    if "price" in tags:
-        return "price"
-
-    # --- lansering ---
-    if "release" in tags or fuzzy_includes(t, RELEASE_QUESTION_WORDS, 2):
-        return "release_window"
-
-    # --- hva er VOTE ---
-    if "domain" in tags or "game" in tags:
-        if fuzzy_includes(
-            t,
-            [
-                "hva er vote",
-                "hva går vote ut på",
-                "hva går spillet ut på",
-                "hva handler vote om",
-                "om vote",
-            ],
-        ) or ("domain" in tags and is_question and "price" not in tags and "release" not in tags):
-            return "what_is_vote"
-
-    # --- hvem lager VOTE / team ---
-    if "domain" in tags or "game" in tags:
-        if fuzzy_includes(
-            t,
-            [
-                "hvem lager vote",
-                "team",
-                "utviklere",
-                "hvor mange jobber",
-                # engelsk variant – i tilfelle vi ikke oversetter
-                "who makes vote",
-            ],
-        ):
-            return "team_size"
-
-    # ekstra: hva er VINTRA (fallback, hvis tidl. spesialregel ikke traff)
-    if fuzzy_includes(
-        t,
-        [
-            "hva er vintra",
-            "om vintra",
-            "hva er vintra studio",
-            "om vintra studio",
-        ],
-    ):
-        return "what_is_vintra"
-
-    # backup-regler – pris
-    if fuzzy_includes(
-        t,
-        [
-            "pris",
-            "kost",
-            "koster",
-            "koste",
-            "hva koster",
-            "hva blir prisen",
-            "hvor mye",
-            "hvor mye vil",
-        ],
-    ):
-        return "price"
-
-    # backup-regler – lansering
-    if fuzzy_includes(t, RELEASE_WORDS, 1):
-        return "release_window"
-
-    # backup-regler – support
-    if fuzzy_includes(
-        t,
-        [
-            "hjelp",
-            "assist",
-            "guide",
-            "støtte",
-            "support",
-            "ticket",
-            "sak",
-            "henvendelse",
-            "kundeservice",
-            "lag sak",
-            "opprett ticket",
-        ],
-    ):
-            return "ask_ticket"
-
-    if fuzzy_includes(t, ADMIN_WORDS, 1):
-        return "ask_ticket"
+    "farewell_word": lambda c: any(tok in FAREWELL_WORDS for tok in c.msg.tokens),
+    "team_size_phrase": lambda c: not c.msg.phrases.isdisjoint(TEAM_SIZE_PHRASES),
+    "ticket_phrase": lambda c: _TICKET_PHRASE_RE.search(c.msg.norm) is not None,
+    "domain_related": lambda c: is_domain_related(c.msg),
+    "yes": lambda c: fuzzy_includes(c.msg, FZ_YES),
+    "no": lambda c: fuzzy_includes(c.msg, FZ_NO),
+    "greet": lambda c: fuzzy_includes(c.msg, FZ_GREET),
+    "thank": lambda c: fuzzy_includes(c.msg, FZ_THANK),
+    "admin": lambda c: fuzzy_includes(c.msg, FZ_ADMIN),
+    "release_word": lambda c: fuzzy_includes(c.msg, FZ_RELEASE),
+    "release_question": lambda c: fuzzy_includes(c.msg, FZ_RELEASE_QUESTION),
+    "gameplay_word": lambda c: fuzzy_includes(c.msg, FZ_GAMEPLAY),
+    "what_is_vintra": lambda c: fuzzy_includes(c.msg, FZ_WHAT_IS_VINTRA),
+    "what_is_vote": lambda c: fuzzy_includes(c.msg, FZ_WHAT_IS_VOTE),
+    "team_word": lambda c: fuzzy_includes(c.msg, FZ_TEAM),
+    "price_word": lambda c: fuzzy_includes(c.msg, FZ_PRICE),
+    "support_word": lambda c: fuzzy_includes(c.msg, FZ_SUPPORT),
+    "followup_what": lambda c: fuzzy_includes(c.msg, FZ_FOLLOWUP_WHAT),
+    "followup_who": lambda c: fuzzy_includes(c.msg, FZ_FOLLOWUP_WHO),
+}
 
+# Første regel (lavest priority) som treffer avgjør. Samme rekkefølge som den
+# gamle if-kaskaden; JA/NEI-sjekken lå der både før og etter ML og er slått
+# sammen (før ML, så modellen ikke kjøres når svaret uansett er JA/NEI), og
+# den doble "hva er vintra"-sjekken er nå bare den prioriterte.
+INTENT_RULES = (
+    # prioritert: hva er vintra / team-størrelse (domain + mengde-ord)
+    Rule(10, "vintra_priority", "what_is_vintra", all_of=("what_is_vintra",)),
+    Rule(20, "team_size_priority", "team_size", all_of=("tag:domain", "team_size_phrase")),
+    # JA/NEI på ticket
+    Rule(30, "confirm_yes", "confirm_ticket_yes", all_of=("awaiting_ticket_confirm", "yes")),
+    Rule(40, "confirm_no", "confirm_ticket_no", all_of=("awaiting_ticket_confirm", "no")),
+    # ML-forslaget (off_topic overlates til reglene)
+    Rule(50, "ml", lambda c: c.ml, all_of=("ml_confident",)),
+    # småprat
+    Rule(60, "emoji", "emoji_smalltalk", all_of=("emoji_only",)),
+    Rule(70, "greeting", "greeting", all_of=("greet",)),
+    Rule(80, "farewell", "farewell", all_of=("farewell_word",)),
+    Rule(90, "thanks", "thanks", all_of=("thank",)),
+    Rule(100, "fragment", "fragment", all_of=("fragment",)),
+    # ticket / support
+    Rule(110, "ticket_short", "ask_ticket", any_of=("tag:ticket", "tag:support"), all_of=("short",)),
+    Rule(120, "ticket_phrase", "ask_ticket", any_of=("tag:ticket", "tag:support"), all_of=("ticket_phrase",)),
+    # tema
+    Rule(130, "gameplay", "gameplay_info", any_of=("tag:gameplay", "gameplay_word")),
+    Rule(140, "web_dev", "web_dev_info", all_of=("tag:web_dev",)),
+    Rule(150, "price_tag", "price", all_of=("tag:price",)),
+    Rule(160, "release", "release_window", any_of=("tag:release", "release_question")),
+    Rule(170, "what_is_vote", "what_is_vote", any_of=("tag:domain", "tag:game"), all_of=("what_is_vote",)),
+    Rule(180, "what_is_vote_question", "what_is_vote",
+         all_of=("tag:domain", "question"), none_of=("tag:price", "tag:release")),
+    Rule(190, "team", "team_size", any_of=("tag:domain", "tag:game"), all_of=("team_word",)),
+    # backup-regler
+    Rule(200, "price_fuzzy", "price", all_of=("price_word",)),
+    Rule(210, "release_fuzzy", "release_window", all_of=("release_word",)),
+    Rule(220, "support_fuzzy", "ask_ticket", all_of=("support_word",)),
+    Rule(230, "admin", "ask_ticket", all_of=("admin",)),
     # kontekst-basert: vi snakket nettopp om vote
-    if state.last_topic == "vote":
-        if fuzzy_includes(t, ["hva går det ut på"], 2):
-            return "what_is_vote"
-        if fuzzy_includes(t, ["hvem lager det"], 2):
-            return "team_size"
-
-    # off-topic
-    if (
-        not is_domain_related(t)
-        and "domain" not in tags
-        and "ticket" not in tags
-        and "support" not in tags
-        and "price" not in tags
-        and "release" not in tags
-        and "gameplay" not in tags
-        and "web_dev" not in tags
-    ):
-        return "off_topic"
-
-    return "other"
-
-
-# ===================== SVAR (kun NORSK, via REPLY_TEMPLATES) =====================
-
-def reply_for(intent: str, state: ChatState) -> str:
+    Rule(240, "followup_what", "what_is_vote", all_of=("last_topic_vote", "followup_what")),
+    Rule(250, "followup_who", "team_size", all_of=("last_topic_vote", "followup_who")),
+    Rule(260, "off_topic", "off_topic", none_of=(
+        "domain_related", "tag:domain", "tag:ticket", "tag:support",
+        "tag:price", "tag:release", "tag:gameplay", "tag:web_dev",
+    )),
+)
+
+INTENT_ENGINE = RuleEngine(INTENT_RULES, RULE_FEATURES, default=Rule(1000, "other", "other"))
+
+
+def get_intent_batch(items) -> list[str]:
+    """
+    get_intent for en liste av (text_no, ChatState). ML kjøres samlet for alle,
+    reglene etterpå i listens rekkefølge (så delt state oppfører seg som før).
+    """
+    msgs = [as_message(text_no) for text_no, _ in items]
+    corrected = [autocorrect_message(msg) for msg in msgs]
+    ml = ml_predict_intent_batch(corrected)
+    return [
+        _memo_intent(msg.norm, state, lambda: _decide_intent(t, state, ml_intent))
+        for msg, t, (_, state), ml_intent in zip(msgs, corrected, items, ml)
+    ]
+
+
+# ===================== SVAR (via REPLY_TEMPLATES + ferdig-oversatte tabeller) =====================
+
+# {språk: templates} bygget med `python reply_translations.py` – tom hvis ikke bygget
+REPLY_TABLE = load_reply_table(REPLY_TEMPLATES)
+
+
+def has_reply_table(lang: str) -> bool:
+    """True hvis vi kan svare direkte på lang uten live oversettelse."""
+    return lang == "no" or lang in REPLY_TABLE
+
+
+def reply_for(intent: str, state: ChatState, lang: str = "no") -> str:
+    """Oppdater state og velg et svar. lang må være "no" eller et språk i REPLY_TABLE."""
     # oppdater state for enkelte intents
     if intent in ("what_is_vote", "team_size", "price", "release_window", "gameplay_info"):
         state.last_topic = "vote"
@@ -565,8 +1008,9 @@ def reply_for(intent: str, state: ChatState) -> str:
     elif intent == "confirm_ticket_no":
         state.awaiting_ticket_confirm = False
 
-    # hent svar fra REPLY_TEMPLATES
-    templates = REPLY_TEMPLATES.get(intent) or REPLY_TEMPLATES.get("fallback")
+    # hent svar fra REPLY_TEMPLATES (eller den oversatte tabellen for lang)
+    table = REPLY_TEMPLATES if lang == "no" else REPLY_TABLE[lang]
+    templates = table.get(intent) or table.get("fallback")
 
     if isinstance(templates, list):
         return random.choice(templates)
@@ -576,7 +1020,25 @@ def reply_for(intent: str, state: ChatState) -> str:
 # ===================== OVERSATT INN/UT =====================
 
 # lag en enkel "protection map" for domenenavn
-PROTECTED_DOMAINS = {w: f"__{w.upper()}__" for w in DOMAIN_WORDS}
+def _protected_domains(domain_words) -> dict[str, str]:
+    return {w: f"__{w.upper()}__" for w in domain_words}
+
+PROTECTED_DOMAINS = _protected_domains(DOMAIN_WORDS)
+
+def _protect_domains(raw: str) -> str:
+    """Bytt domenenavn med plassholdere før oversettelse."""
+    protected = raw
+    for w, token in PROTECTED_DOMAINS.items():
+        protected = re.sub(rf"\b{re.escape(w)}\b", token, protected, flags=re.IGNORECASE)
+    return protected
+
+
+def _restore_domains(translated: str) -> str:
+    """Fjern beskyttelsen igjen etter oversettelse."""
+    for w, token in PROTECTED_DOMAINS.items():
+        translated = translated.replace(token, w)
+    return translated
+
 
 def normalize_to_norwegian(text: str, detected_lang: str) -> tuple[str, str]:
     """
@@ -588,62 +1050,312 @@ def normalize_to_norwegian(text: str, detected_lang: str) -> tuple[str, str]:
     if detected_lang == "no":
         return raw, "no"
 
-    protected = raw
-    # beskytt domenenavn før oversettelse
-    for w, token in PROTECTED_DOMAINS.items():
-        protected = re.sub(rf"\b{re.escape(w)}\b", token, protected, flags=re.IGNORECASE)
+    # cachet oppslag – feil i oversetteren gir uoversatt tekst tilbake
+    with timed(STAGE_SECONDS, "translate_in"):
+        translated = translate(_protect_domains(raw), "auto", "no")
+    return _restore_domains(translated), detected_lang
 
-    try:
-        translated = GT(source="auto", target="no").translate(protected) if GT else protected
-    except Exception:
-        translated = protected
 
-    # fjern beskyttelse igjen
-    for w, token in PROTECTED_DOMAINS.items():
-        translated = translated.replace(token, w)
+async def normalize_to_norwegian_async(text: str, detected_lang: str) -> tuple[str, str]:
+    """Som normalize_to_norwegian, men med frist/kretsbryter og uten å blokkere."""
+    raw = text or ""
+    if detected_lang == "no":
+        return raw, "no"
 
-    return translated, detected_lang
+    with timed(STAGE_SECONDS, "translate_in"):
+        translated = await translate_async(_protect_domains(raw), "auto", "no")
+    return _restore_domains(translated), detected_lang
 
 
 # ===================== HOVEDFUNKSJON =====================
 
+def _begin_turn(text: str, state: ChatState) -> tuple[Message, str]:
+    """Steg 0–1: analyser meldingen én gang og velg språk."""
+    with timed(STAGE_SECONDS, "lang_detect"):
+        msg = parse_message(text)
+        return msg, pick_lang_for_message(msg, state)
+
+
+def _reply_in(intent: str, state: ChatState, lang: str) -> tuple[str, bool]:
+    """Svar på lang hvis vi har en ferdig tabell, ellers norsk. Returnerer (svar, må_oversettes)."""
+    with timed(STAGE_SECONDS, "reply"):
+        if has_reply_table(lang):
+            return reply_for(intent, state, lang), False
+        return reply_for(intent, state), True
+
+
+def _intent_and_reply(msg: Message, text_no: str, lang: str, state: ChatState) -> tuple[str, str, bool]:
+    """Steg 3–4: intent på norsk + svar. Returnerer (intent, svar, må_oversettes)."""
+    # uoversatt tekst kan gjenbruke meldingen vi har
+    intent = get_intent(msg if text_no == msg.raw else text_no, state)
+    return (intent, *_reply_in(intent, state, lang))
+
+
+def _turn_result(reply: str, lang: str, intent: str, state: ChatState) -> dict:
+    return {
+        "reply": reply,
+        "lang": lang,
+        "intent": intent,
+        "awaiting_ticket_confirm": state.awaiting_ticket_confirm,
+        "active_view": state.active_view,
+        "last_topic": state.last_topic,
+    }
+
+
 def handle_message(text: str, state: ChatState | None = None):
     """
     1) Velg språk for bruker (med historikk)
     2) Oversett inn-tekst til norsk
     3) Finn intent (ML + regler) på norsk
-    4) Lag svar på norsk
-    5) Oversett svaret tilbake til brukerens språk
+    4) Lag svar (direkte på brukerens språk hvis vi har en ferdig tabell)
+    5) Ellers: oversett svaret tilbake til brukerens språk
     """
     if state is None:
         state = ChatState()
 
-    # 1: gjett språk (med historikk / "sjanse")
-    user_lang = pick_lang_for_message(text, state)
-
-    # 2: oversett inn til norsk
+    msg, user_lang = _begin_turn(text, state)
     text_no, original_lang = normalize_to_norwegian(text, user_lang)
+    intent, reply, pending = _intent_and_reply(msg, text_no, original_lang, state)
+    if pending:
+        with timed(STAGE_SECONDS, "translate_out"):
+            reply = translate(reply, "no", original_lang)
+    return _turn_result(reply, original_lang, intent, state), state
 
-    # 3: intent på norsk
-    intent = get_intent(text_no, state)
 
-    # 4: svar på norsk
-    reply_no = reply_for(intent, state)
+async def _run_cpu(executor, fn, *args):
+    """Kjør fn i executor hvis vi har en, ellers rett her i event-loopen."""
+    if executor is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
 
-    # 5: oversett svar tilbake til brukerens språk
-    if original_lang != "no":
-        try:
-            reply_out = GT(source="no", target=original_lang).translate(reply_no) if GT else reply_no
-        except Exception:
-            reply_out = reply_no
-    else:
-        reply_out = reply_no
 
-    return {
-        "reply": reply_out,
-        "lang": original_lang,
-        "intent": intent,
-        "awaiting_ticket_confirm": state.awaiting_ticket_confirm,
-        "active_view": state.active_view,
-        "last_topic": state.last_topic,
-    }, state
+async def handle_message_async(text: str, state: ChatState | None = None, executor=None):
+    """
+    Som handle_message, men oversettelsene awaites (frist, samtidighetsgrense
+    og kretsbryter i translation.Translator). Gir samme resultat.
+    Med executor kjøres CPU-stegene (språk, stavekorreksjon, fuzzy-matching, ML)
+    der i stedet for i event-loopen. Kalleren må sørge for at samme state ikke
+    brukes av to kall samtidig.
+    """
+    if state is None:
+        state = ChatState()
+
+    async for result, final in handle_message_stream(text, state, executor):
+        if final:
+            return result, state
+
+
+async def handle_message_stream(text: str, state: ChatState, executor=None):
+    """
+    Som handle_message_async, men som async-generator av (resultat, final).
+    Må svaret oversettes, kommer det norske svaret først (lang "no", final=False)
+    og det oversatte etterpå (final=True). Ellers bare ett, endelig resultat.
+    """
+    msg, user_lang = await _run_cpu(executor, _begin_turn, text, state)
+    text_no, original_lang = await normalize_to_norwegian_async(text, user_lang)
+    intent, reply, pending = await _run_cpu(
+        executor, _intent_and_reply, msg, text_no, original_lang, state
+    )
+    if pending:
+        yield _turn_result(reply, "no", intent, state), False
+        with timed(STAGE_SECONDS, "translate_out"):
+            reply = await translate_async(reply, "no", original_lang)
+    yield _turn_result(reply, original_lang, intent, state), True
+
+
+def _batch_begin(items) -> tuple[list[ChatState], list[tuple[Message, str]], list]:
+    """Batch steg 1: språk for alle (avhenger bare av tidligere språkvalg) + hva som må oversettes inn."""
+    states = [state if state is not None else ChatState() for _, state in items]
+    begun = [_begin_turn(text, state) for (text, _), state in zip(items, states)]
+    inbound = [
+        (i, (_protect_domains(text or ""), "auto", "no"))
+        for i, ((text, _), (_, lang)) in enumerate(zip(items, begun)) if lang != "no"
+    ]
+    return states, begun, inbound
+
+
+def _batch_turns(items, states, begun, inbound, translated) -> list[tuple[dict, bool]]:
+    """Batch steg 3–4: stavekorreksjon + ML for alle på én gang, så regler + svar i rekkefølge."""
+    texts_no = [text or "" for text, _ in items]
+    for (i, _), text in zip(inbound, translated):
+        texts_no[i] = _restore_domains(text)
+
+    msgs_no = [msg if text_no == msg.raw else as_message(text_no) for (msg, _), text_no in zip(begun, texts_no)]
+    corrected = [autocorrect_message(msg) for msg in msgs_no]
+    ml = ml_predict_intent_batch(corrected)
+
+    # state og random.choice som ved enkeltkall
+    turns = []
+    for msg, t, ml_intent, (_, lang), state in zip(msgs_no, corrected, ml, begun, states):
+        intent = _memo_intent(msg.norm, state, lambda: _decide_intent(t, state, ml_intent))
+        reply, pending = _reply_in(intent, state, lang)
+        # state-feltene leses nå, før senere meldinger i samme sesjon endrer dem
+        turns.append((_turn_result(reply, lang, intent, state), pending))
+    return turns
+
+
+def _batch_outbound(turns) -> list[tuple[int, tuple[str, str, str]]]:
+    return [
+        (i, (result["reply"], "no", result["lang"]))
+        for i, (result, pending) in enumerate(turns) if pending
+    ]
+
+
+def _batch_finish(turns, outbound, translated, states) -> list[tuple[dict, ChatState]]:
+    for (i, _), reply in zip(outbound, translated):
+        turns[i][0]["reply"] = reply
+    return [(result, state) for (result, _), state in zip(turns, states)]
+
+
+def handle_message_batch(items) -> list[tuple[dict, ChatState]]:
+    """
+    handle_message for en liste av (tekst, ChatState | None).
+    Gir samme resultat som å kalle handle_message for hvert element i rekkefølge,
+    men ML kjøres som én matrise-operasjon og like oversettelser (inn og ut)
+    gjøres bare én gang. Elementer som deler ChatState behandles i listens rekkefølge.
+    """
+    states, begun, inbound = _batch_begin(items)
+    with timed(STAGE_SECONDS, "translate_in"):
+        translated_in = translate_many([req for _, req in inbound])
+    turns = _batch_turns(items, states, begun, inbound, translated_in)
+    outbound = _batch_outbound(turns)
+    with timed(STAGE_SECONDS, "translate_out"):
+        translated_out = translate_many([req for _, req in outbound])
+    return _batch_finish(turns, outbound, translated_out, states)
+
+
+async def handle_message_batch_async(items, executor=None) -> list[tuple[dict, ChatState]]:
+    """
+    Som handle_message_batch, men oversettelsene awaites samtidig (frist,
+    samtidighetsgrense og kretsbryter i translation.Translator), og bare
+    CPU-stegene kjøres i executor.
+    """
+    states, begun, inbound = await _run_cpu(executor, _batch_begin, items)
+    with timed(STAGE_SECONDS, "translate_in"):
+        translated_in = await translate_many_async([req for _, req in inbound])
+    turns = await _run_cpu(executor, _batch_turns, items, states, begun, inbound, translated_in)
+    outbound = _batch_outbound(turns)
+    with timed(STAGE_SECONDS, "translate_out"):
+        translated_out = await translate_many_async([req for _, req in outbound])
+    return _batch_finish(turns, outbound, translated_out, states)
+
+
+# ===================== HOT RELOAD AV TEKSTENE =====================
+# reload_texts() leser tekstene på nytt (texts_source.load_texts) og bygger
+# bare de avledede strukturene som hviler på navn som faktisk er endret.
+# Alt nytt bygges ved siden av det gamle og byttes inn med én globals().update,
+# så meldinger som er i gang aldri ser en halvbygget struktur og ikke må vente.
+# En melding som går akkurat mens byttet skjer, kan bruke gamle lister i ett
+# steg og nye i det neste. RULES_HASH / ML_DATA_HASH endres, så INTENT_CACHE
+# tømmes av seg selv ved neste oppslag.
+
+def _fingerprint(value) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=sorted)
+
+
+_TEXT_FINGERPRINTS = {name: _fingerprint(globals()[name]) for name in TEXT_NAMES}
+
+
+def _reply_table_mtime():
+    try:
+        return os.stat(REPLY_TABLE_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+_REPLY_TABLE_MTIME = _reply_table_mtime()
+
+TEXTS_GENERATION = 0  # øker for hver reload som endret noe
+
+
+def reload_texts(path: str | None = None) -> list[str]:
+    """
+    Les tekstene fra path (standard: BOT_TEXTS_PATH eller bot_texts.py) og bytt
+    inn det som er endret. Returnerer navnene på det som ble byttet.
+    Modellen trenes bare på nytt hvis ML_TRAIN_DATA er endret (og den er lastet).
+    Feiler noe, er ingenting byttet.
+    """
+    global TEXTS_GENERATION, _REPLY_TABLE_MTIME
+    texts = load_texts(path)
+    # samme lås som lat lasting, så en modell som lastes akkurat nå ikke bygges fra gamle data
+    with _LAZY_LOCK:
+        g = globals()
+        changed = {n for n in TEXT_NAMES if _fingerprint(texts[n]) != _TEXT_FINGERPRINTS[n]}
+        reply_mtime = _reply_table_mtime()
+        if not changed and reply_mtime == _REPLY_TABLE_MTIME:
+            return []
+
+        new = {n: texts[n] for n in changed}
+
+        fuzzy = {
+            fz: fuzzy_index(texts[src], g[fz].max_dist)
+            for fz, src in _FUZZY_SOURCES.items() if src in changed
+        }
+        indexes = [fuzzy[fz] if fz in fuzzy else g[fz] for fz in _FUZZY_SOURCES]
+        if fuzzy:
+            new.update(fuzzy)
+            # gamle indekser som ikke brukes lenger, skal ikke bli liggende
+            new["_FUZZY_INDEXES"] = {k: v for k, v in _FUZZY_INDEXES.items() if v in indexes}
+        if fuzzy or changed & {"KEYWORD_TAGS", "TEAM_SIZE_WORDS"}:
+            new["PHRASE_MATCHER"] = _build_phrase_matcher(
+                texts["KEYWORD_TAGS"], indexes, texts["TEAM_SIZE_WORDS"]
+            )
+            new["_PHRASE_INDEXES"] = set(indexes)
+        if "TEAM_SIZE_WORDS" in changed:
+            new["TEAM_SIZE_PHRASES"] = frozenset(texts["TEAM_SIZE_WORDS"])
+        if "LANG_HINT_WORDS" in changed:
+            # språkkodene i ChatState er faste (lagrede sesjoner) – nye språk krever en kode først
+            _check_langs(texts["LANG_HINT_WORDS"])
+            new["LANG_ORDER"] = tuple(texts["LANG_HINT_WORDS"]) + ("en",)
+            new["LANG_LEXICON"] = _build_lang_lexicon(texts["LANG_HINT_WORDS"])
+        if changed & {"KEYWORD_TAGS", "QUESTION_WORDS", "DOMAIN_WORDS"}:
+            (
+                new["AUTOCORRECT_VOCAB"], new["_AUTOCORRECT_NORMED"], new["AUTOCORRECT_INDEX"]
+            ) = _build_autocorrect(texts["KEYWORD_TAGS"], texts["QUESTION_WORDS"], texts["DOMAIN_WORDS"])
+        if "DOMAIN_WORDS" in changed:
+            new["PROTECTED_DOMAINS"] = _protected_domains(texts["DOMAIN_WORDS"])
+        if "REPLY_TEMPLATES" in changed or reply_mtime != _REPLY_TABLE_MTIME:
+            new["REPLY_TABLE"] = load_reply_table(texts["REPLY_TEMPLATES"])
+        if "ML_TRAIN_DATA" in changed and _ML_LOADED:
+            new.update(_build_intent_model(texts["ML_TRAIN_DATA"]))
+        if changed.intersection(_RULE_TEXTS):
+            new["RULES_HASH"] = _rules_hash(texts)
+
+        g.update(new)
+        _TEXT_FINGERPRINTS.update((n, _fingerprint(texts[n])) for n in changed)
+        _REPLY_TABLE_MTIME = reply_mtime
+        TEXTS_GENERATION += 1
+    return sorted(new)
+
+
+def texts_watcher(path: str | None = None, interval: float = 2.0) -> TextsWatcher:
+    """TextsWatcher (ikke startet) som kaller reload_texts(path) når tekstfilen eller svartabellen endres."""
+    return TextsWatcher(
+        [path or texts_path(), REPLY_TABLE_PATH],
+        lambda: reload_texts(path),
+        interval,
+    )
+
+
+# ===================== OPPSTART =====================
+
+def warmup() -> dict[str, float]:
+    """
+    Last spaCy, intent-modellen og oversetteren nå i stedet for ved første melding.
+    Kalles ved oppstart av serveren (handler.py). Returnerer STARTUP_TIMINGS.
+    """
+    get_nlp()
+    ensure_intent_model()
+    if "translator" not in STARTUP_TIMINGS:
+        t0 = time.perf_counter()
+        warmup_translator()
+        STARTUP_TIMINGS["translator"] = time.perf_counter() - t0
+    return startup_timings()
+
+
+def startup_timings() -> dict[str, float]:
+    """Kopi av STARTUP_TIMINGS (import av modulen + det som er lastet så langt)."""
+    return dict(STARTUP_TIMINGS)
+
+
+STARTUP_TIMINGS["import"] = time.perf_counter() - _IMPORT_T0
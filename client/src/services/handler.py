@@ -1,9 +1,62 @@
-from fastapi import FastAPI
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from chatbot_core import handle_message, ChatState
+from pydantic import BaseModel, Field
+from chatbot_core import (
+    INTENT_CACHE, handle_message_async, handle_message_batch_async, handle_message_stream, ChatState, warmup,
+    reload_texts, texts_watcher,
+)
+from session_store import SessionLocks, session_store_from_env
+import metrics
+
+log = logging.getLogger(__name__)
+
+# CPU-arbeidet (språk, stavekorreksjon, fuzzy-matching, ML) kjøres her, ikke i
+# event-loopen eller Starlettes threadpool. Oversettelser awaites i loopen.
+CPU_WORKERS = int(os.environ.get("CHAT_CPU_WORKERS", os.cpu_count() or 4))
+BATCH_MAX_MESSAGES = int(os.environ.get("CHAT_BATCH_MAX_MESSAGES", 100))
+# sjekk tekstfilen (BOT_TEXTS_PATH eller bot_texts.py) hvert n. sekund og last endringer; 0 = av
+TEXTS_RELOAD_INTERVAL = float(os.environ.get("BOT_TEXTS_RELOAD", 0))
+
+# eies av lifespan: stenges ved shutdown og lages på nytt ved neste bruk
+CPU_EXECUTOR: ThreadPoolExecutor | None = None
+
+
+def cpu_executor() -> ThreadPoolExecutor:
+    global CPU_EXECUTOR
+    if CPU_EXECUTOR is None:
+        CPU_EXECUTOR = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="chat-cpu")
+    return CPU_EXECUTOR
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global CPU_EXECUTOR
+    # tekster fra en egen fil brukes fra start (før modellen trenes i warmup)
+    if os.environ.get("BOT_TEXTS_PATH"):
+        reload_texts()
+    # last spaCy / intent-modell / oversetter før vi tar imot trafikk
+    executor = cpu_executor()
+    timings = warmup()
+    log.info("chatbot warmup: %s", ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in timings.items()))
+    watcher = texts_watcher(interval=TEXTS_RELOAD_INTERVAL).start() if TEXTS_RELOAD_INTERVAL > 0 else None
+    yield
+    if watcher is not None:
+        watcher.stop()
+    if CPU_EXECUTOR is executor:
+        CPU_EXECUTOR = None
+    executor.shutdown(wait=False)
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -13,8 +66,67 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-# enkel in-memory state pr. sessionId
-SESSIONS: dict[str, ChatState] = {}
+# state pr. sessionId – LRU + idle-TTL i minnet, eller SQLite (SESSION_STORE_PATH).
+# Lages ved første bruk, ikke ved import: prefork.py importerer appen før fork, og
+# en SQLite-forbindelse kan ikke arves av workerne.
+SESSIONS = None
+
+
+def sessions():
+    global SESSIONS
+    if SESSIONS is None:
+        SESSIONS = session_store_from_env()
+    return SESSIONS
+
+SESSION_LOCKS = SessionLocks()
+
+REQUEST_SECONDS = metrics.histogram(
+    "chatbot_http_request_seconds", "Tid pr. HTTP-kall.", ("path", "status")
+)
+
+
+def _session_metrics() -> list[str]:
+    stats = sessions().stats()
+    return (
+        metrics.gauge_lines("chatbot_sessions", "Antall lagrede sesjoner.", stats["sessions"])
+        + metrics.gauge_lines("chatbot_sessions_bytes", "Omtrentlig minne/filstørrelse for sesjonene.", stats["approx_bytes"])
+        + metrics.gauge_lines("chatbot_session_lru_evictions_total", "Sesjoner kastet pga. maks antall.", stats["lru_evictions"], "counter")
+        + metrics.gauge_lines("chatbot_session_ttl_evictions_total", "Sesjoner kastet pga. inaktivitet.", stats["ttl_evictions"], "counter")
+    )
+
+
+metrics.register_collector(_session_metrics)
+
+
+async def _sessions_io(fn, *args):
+    """Kall mot sesjonslagringen; SQLite-lagringen gjør disk-I/O og kjøres i threadpoolen, ikke i event-loopen."""
+    if sessions().blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+
+def _load_states(session_ids) -> dict[str, ChatState]:
+    store = sessions()
+    return {sid: store.get(sid) or ChatState() for sid in session_ids}
+
+
+def _save_states(states: dict[str, ChatState]) -> None:
+    store = sessions()
+    for sid, state in states.items():
+        store.put(sid, state)
+
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    if not metrics.ENABLED:
+        return await call_next(request)
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    # rute-mønsteret, ikke rå URL, så labels ikke vokser med query/ids
+    route = request.scope.get("route")
+    path = getattr(route, "path", "other")
+    REQUEST_SECONDS.observe(time.perf_counter() - t0, path, str(response.status_code))
+    return response
 
 class ChatRequest(BaseModel):
     session_id: str
@@ -28,17 +140,106 @@ class ChatResponse(BaseModel):
     active_view: str | None
     last_topic: str | None
 
+class ChatBatchRequest(BaseModel):
+    # i rekkefølge; meldinger i samme sesjon behandles i den rekkefølgen de står
+    messages: list[ChatRequest] = Field(min_length=1, max_length=BATCH_MAX_MESSAGES)
+
+class ChatBatchResponse(BaseModel):
+    replies: list[ChatResponse]  # samme rekkefølge som messages
+
 @app.post("/api/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    state = SESSIONS.get(req.session_id) or ChatState()
-    result, state = handle_message(req.text, state)
-    SESSIONS[req.session_id] = state
+async def chat(req: ChatRequest):
+    # meldinger i samme sesjon behandles én om gangen, i ankomstrekkefølge
+    async with SESSION_LOCKS.lock(req.session_id):
+        state = await _sessions_io(sessions().get, req.session_id) or ChatState()
+        result, state = await handle_message_async(req.text, state, executor=cpu_executor())
+        await _sessions_io(sessions().put, req.session_id, state)
     return ChatResponse(**result)
 
+@app.post("/api/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(req: ChatBatchRequest):
+    """
+    Flere meldinger (én eller flere sesjoner) i ett kall. ML kjøres samlet og
+    like oversettelser gjøres én gang, samtidig (handle_message_batch_async).
+    """
+    session_ids = sorted({m.session_id for m in req.messages})
+    async with AsyncExitStack() as stack:
+        # alltid samme låserekkefølge, så to batcher med overlappende sesjoner ikke låser hverandre
+        for sid in session_ids:
+            await stack.enter_async_context(SESSION_LOCKS.lock(sid))
+        states = await _sessions_io(_load_states, session_ids)
+        items = [(m.text, states[m.session_id]) for m in req.messages]
+        results = await handle_message_batch_async(items, executor=cpu_executor())
+        await _sessions_io(_save_states, states)
+    return ChatBatchResponse(replies=[ChatResponse(**result) for result, _ in results])
+
+async def _receive_json(ws: WebSocket):
+    """
+    Neste ramme som JSON, eller None hvis den ikke kan leses. Binære rammer
+    leses som UTF-8. Lukker klienten, kastes WebSocketDisconnect.
+    """
+    message = await ws.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    raw = message.get("text")
+    if raw is None and message.get("bytes") is not None:
+        try:
+            raw = message["bytes"].decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+@app.websocket("/api/chat/ws")
+async def chat_ws(ws: WebSocket, session_id: str | None = None):
+    """
+    Én ChatState pr. tilkobling. Klienten sender {"text": ...}; vi svarer med
+    {"type": "reply", "final": bool, ...ChatResponse-feltene}. Må svaret
+    oversettes, kommer det norske svaret først (final=false), så det oversatte.
+    Med ?session_id=... deles state med /api/chat for samme sesjon.
+    """
+    await ws.accept()
+    state = (await _sessions_io(sessions().get, session_id) if session_id else None) or ChatState()
+    try:
+        while True:
+            data = await _receive_json(ws)
+            text = data.get("text") if isinstance(data, dict) else None
+            if not isinstance(text, str):
+                await ws.send_json({"type": "error", "detail": "forventet {\"text\": \"...\"}"})
+                continue
+            if session_id:
+                # samme lås som /api/chat; state lastes på nytt i tilfelle HTTP-kall har endret den
+                async with SESSION_LOCKS.lock(session_id):
+                    state = await _sessions_io(sessions().get, session_id) or state
+                    async for result, final in handle_message_stream(text, state, cpu_executor()):
+                        await ws.send_json({"type": "reply", "final": final, **result})
+                    await _sessions_io(sessions().put, session_id, state)
+            else:
+                async for result, final in handle_message_stream(text, state, cpu_executor()):
+                    await ws.send_json({"type": "reply", "final": final, **result})
+    except WebSocketDisconnect:
+        pass
+
 @app.post("/api/chatbot", response_model=ChatResponse)
-def chat_compat(req: ChatRequest):
-    return chat(req)
+async def chat_compat(req: ChatRequest):
+    return await chat(req)
 
 @app.post("/api/handler", response_model=ChatResponse)
-def chat_handler(req: ChatRequest):
-    return chat(req)
+async def chat_handler(req: ChatRequest):
+    return await chat(req)
+
+@app.get("/api/sessions/stats")
+def session_stats():
+    return sessions().stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/intent-cache/stats")
+def intent_cache_stats():
+    return INTENT_CACHE.stats()
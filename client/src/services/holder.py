@@ -1,16 +1,32 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from retrieval_index import RetrievalIndex
 
 class SimpleRetrievalBot:
-    def __init__(self, qa_pairs):
+    def __init__(self, qa_pairs=(), index: RetrievalIndex | None = None):
         """
         qa_pairs: liste av (spørsmål, svar)
+        index: ferdig RetrievalIndex (f.eks. fra RetrievalIndex.load) i stedet for qa_pairs
         """
-        self.questions = [q for q, _ in qa_pairs]
-        self.answers = [a for _, a in qa_pairs]
+        self.index = index if index is not None else RetrievalIndex()
+        if qa_pairs:
+            self.index.add_many(qa_pairs)
 
-        self.vectorizer = TfidfVectorizer(ngram_range=(1,2))
-        self.question_matrix = self.vectorizer.fit_transform(self.questions)
+    @classmethod
+    def load(cls, path):
+        return cls(index=RetrievalIndex.load(path))
+
+    def save(self, path):
+        self.index.save(path)
+
+    def add(self, question, answer):
+        """Legg til ett par uten å bygge alt på nytt. Returnerer id-en (til remove)."""
+        return self.index.add(question, answer)
+
+    def remove(self, doc_id):
+        return self.index.remove(doc_id)
+
+    def top_k(self, text, k=5, min_sim=0.0):
+        """De k mest like parene som Hit(doc_id, score, question, answer), best først."""
+        return self.index.search(text, k=k, min_score=min_sim)
 
     def get_response(self, text, min_sim=0.2):
         """
@@ -20,15 +36,11 @@ class SimpleRetrievalBot:
         if not text.strip():
             return "Si gjerne noe mer, så skal jeg prøve å hjelpe 😊"
 
-        x = self.vectorizer.transform([text])
-        sims = cosine_similarity(x, self.question_matrix)[0]
-        best_idx = sims.argmax()
-        best_score = sims[best_idx]
-
-        if best_score < min_sim:
+        hits = self.index.search(text, k=1, min_score=min_sim)
+        if not hits:
             return "Jeg er ikke helt sikker – kan du forklare det på en annen måte?"
 
-        return self.answers[best_idx]
+        return hits[0].answer
 
 if __name__ == "__main__":
     data = [
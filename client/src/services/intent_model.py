@@ -0,0 +1,205 @@
+# intent_model.py
+"""
+Ferdigtrent intent-modell (TF-IDF + LogisticRegression) lagret på disk.
+
+I stedet for å trene på ML_TRAIN_DATA i hver prosess ved import, trener vi
+én gang offline:
+
+    python intent_model.py            # skriver intent_model.joblib
+
+Filen er merket med en hash av treningsdataene og preprosesseringen.
+chatbot_core laster den (minne-mappet, så forkede workers deler sidene)
+og trener bare på nytt hvis hashen ikke stemmer.
+
+joblib/numpy/scikit-learn importeres først når en modell faktisk lastes,
+trenes eller kompileres (_import_ml), ikke ved import av denne modulen.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+# fylles inn av _import_ml() ved første bruk
+joblib = None
+np = None
+sklearn = None
+TfidfVectorizer = None
+LogisticRegression = None
+_ML_IMPORT_TRIED = False
+
+
+def _import_ml() -> bool:
+    """Importer joblib/numpy/scikit-learn første gang de trengs. False hvis de mangler."""
+    global joblib, np, sklearn, TfidfVectorizer, LogisticRegression, _ML_IMPORT_TRIED
+    if not _ML_IMPORT_TRIED:
+        _ML_IMPORT_TRIED = True
+        try:
+            import joblib as _joblib
+            import numpy as _np
+            import sklearn as _sklearn
+            from sklearn.feature_extraction.text import TfidfVectorizer as _Tfidf
+            from sklearn.linear_model import LogisticRegression as _LogReg
+        except Exception:
+            return False
+        joblib, np, sklearn = _joblib, _np, _sklearn
+        TfidfVectorizer, LogisticRegression = _Tfidf, _LogReg
+    return sklearn is not None
+
+
+MODEL_FORMAT = 1
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.joblib")
+
+
+def training_hash(data, preprocess_id: str) -> str:
+    """Hash av (tekst, intent)-parene + hvilken preprosessering som ble brukt."""
+    payload = json.dumps(
+        {"format": MODEL_FORMAT, "preprocess": preprocess_id, "data": [list(p) for p in data]},
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def train_intent_model(data, preprocess):
+    """Tren (vectorizer, classifier) på data. preprocess: tekst -> tekst."""
+    if not _import_ml():
+        return None, None
+    texts = [preprocess(t) for t, _ in data]
+    labels = [intent for _, intent in data]
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=1)
+    X = vectorizer.fit_transform(texts)
+    classifier = LogisticRegression(max_iter=1000)
+    classifier.fit(X, labels)
+    return vectorizer, classifier
+
+
+def save_intent_model(vectorizer, classifier, data_hash: str, path: str = DEFAULT_PATH) -> None:
+    """Skriv modellen atomisk (tmp-fil + rename), ukomprimert så den kan minne-mappes."""
+    _import_ml()
+    artifact = {
+        "format": MODEL_FORMAT,
+        "data_hash": data_hash,
+        "sklearn": sklearn.__version__,
+        "vectorizer": vectorizer,
+        "classifier": classifier,
+    }
+    tmp = path + ".tmp"
+    joblib.dump(artifact, tmp)
+    os.replace(tmp, path)
+
+
+def load_intent_model(data_hash: str, path: str = DEFAULT_PATH, mmap: bool = True):
+    """
+    (vectorizer, classifier) fra fil, eller None hvis filen mangler, er ødelagt,
+    ble laget med en annen sklearn-versjon eller fra andre treningsdata.
+    """
+    if not os.path.exists(path) or not _import_ml():
+        return None
+    try:
+        artifact = joblib.load(path, mmap_mode="r" if mmap else None)
+    except Exception:
+        return None
+    if not isinstance(artifact, dict):
+        return None
+    if artifact.get("format") != MODEL_FORMAT or artifact.get("sklearn") != sklearn.__version__:
+        return None
+    if artifact.get("data_hash") != data_hash:
+        return None
+    return artifact["vectorizer"], artifact["classifier"]
+
+
+# ===================== KOMPILERT INFERENS =====================
+
+class CompiledIntentModel:
+    """
+    Samme modell som (vectorizer, classifier), men uten sklearn/scipy pr. kall:
+    n-gram -> kolonne-oppslag, idf og koeffisienter som NumPy, og softmax
+    regnet direkte over de få kolonnene meldingen faktisk treffer.
+    Gir de samme sannsynlighetene som predict_proba (innenfor flyttallsavrunding).
+    """
+
+    def __init__(self, vectorizer, classifier):
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = dict(vectorizer.vocabulary_)
+        self.idf = np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else None
+        self.sublinear_tf = vectorizer.sublinear_tf
+        self.norm = vectorizer.norm
+        # (n_features, n_classes) så en rad pr. aktiv kolonne kan hentes direkte
+        self.coef_t = np.ascontiguousarray(np.asarray(classifier.coef_, dtype=np.float64).T)
+        self.intercept = np.asarray(classifier.intercept_, dtype=np.float64)
+        self.classes = list(classifier.classes_)
+        self._ovr = (
+            getattr(classifier, "multi_class", "auto") == "ovr"
+            or getattr(classifier, "solver", "") == "liblinear"
+        )
+
+    def features(self, text: str):
+        """(kolonner, tf-idf-vekter) for teksten, l2-normalisert som i TfidfVectorizer."""
+        counts: dict[int, int] = {}
+        vocab = self.vocabulary
+        for gram in self.analyzer(text):
+            col = vocab.get(gram)
+            if col is not None:
+                counts[col] = counts.get(col, 0) + 1
+        cols = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.sublinear_tf:
+            weights = np.log(weights) + 1.0
+        if self.idf is not None:
+            weights *= self.idf[cols]
+        if self.norm == "l2":
+            length = np.sqrt(np.dot(weights, weights))
+            if length > 0:
+                weights /= length
+        elif self.norm == "l1":
+            length = np.abs(weights).sum()
+            if length > 0:
+                weights /= length
+        return cols, weights
+
+    def decision_function(self, text: str):
+        cols, weights = self.features(text)
+        return self.intercept + weights @ self.coef_t[cols]
+
+    def predict_proba(self, text: str):
+        scores = self.decision_function(text)
+        if scores.shape[0] == 1:
+            # binær modell: én logit for klasse 1
+            p1 = 1.0 / (1.0 + np.exp(-scores[0]))
+            return np.array([1.0 - p1, p1])
+        if self._ovr:
+            probs = 1.0 / (1.0 + np.exp(-scores))
+            return probs / probs.sum()
+        scores = scores - scores.max()
+        np.exp(scores, out=scores)
+        return scores / scores.sum()
+
+
+def compile_intent_model(vectorizer, classifier) -> CompiledIntentModel | None:
+    if vectorizer is None or classifier is None or not _import_ml():
+        return None
+    return CompiledIntentModel(vectorizer, classifier)
+
+
+def main(argv=None) -> int:
+    from bot_texts import ML_TRAIN_DATA
+    from chatbot_core import ml_preprocess, ml_preprocess_id
+
+    parser = argparse.ArgumentParser(description="Tren og lagre intent-modellen.")
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    if not _import_ml():
+        print("scikit-learn er ikke installert – kan ikke trene.", file=sys.stderr)
+        return 1
+
+    preprocess_id = ml_preprocess_id()
+    data_hash = training_hash(ML_TRAIN_DATA, preprocess_id)
+    vectorizer, classifier = train_intent_model(ML_TRAIN_DATA, ml_preprocess)
+    save_intent_model(vectorizer, classifier, data_hash, args.out)
+    print(f"skrev modell ({len(ML_TRAIN_DATA)} eksempler, {preprocess_id}) til {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
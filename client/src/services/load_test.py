@@ -0,0 +1,138 @@
+# load_test.py
+"""
+Enkel lasttest for chat-API-et.
+
+Uten --url kjøres appen i samme prosess (httpx + ASGI) med en falsk
+oversetter som bruker --latency sekunder pr. kall, og vi sammenligner:
+  async   /api/chat (await på oversettelse, CPU i CHAT_CPU_WORKERS-executor)
+  sync    den gamle synkrone varianten (handle_message i Starlettes threadpool)
+
+    python load_test.py                       # begge, 2000 meldinger, 64 samtidige
+    python load_test.py --mode async -n 5000 -c 200 --latency 0.1
+    python load_test.py --url http://localhost:8000   # bare /api/chat mot en kjørende server
+
+Skriver meldinger/s og latens (p50/p95/p99) pr. modus.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+MESSAGES = [
+    "hei",
+    "hva koster vote",
+    "når kommer spillet",
+    "hvordan er gameplay",
+    "jeg trenger hjelp fra support",
+    "what is the price of vote",
+    "when is the game out",
+    "who makes vote",
+    "hola, cuánto cuesta vote",
+    "takk for hjelpen",
+]
+
+
+def _add_sync_route(app):
+    """Den gamle synkrone /api/chat, bare for sammenligning."""
+    import handler
+    from chatbot_core import ChatState, handle_message
+
+    def chat_sync(req: handler.ChatRequest):
+        state = handler.SESSIONS.get(req.session_id) or ChatState()
+        result, state = handle_message(req.text, state)
+        handler.SESSIONS.put(req.session_id, state)
+        return handler.ChatResponse(**result)
+
+    app.post("/loadtest/sync-chat", response_model=handler.ChatResponse)(chat_sync)
+
+
+async def _run(client: httpx.AsyncClient, path: str, total: int, concurrency: int, sessions: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            body = {"session_id": f"s{i % sessions}", "text": MESSAGES[i % len(MESSAGES)]}
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post(path, json=body)
+                resp.raise_for_status()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def _print(mode: str, r: dict) -> None:
+    print(
+        f"{mode:6s} {r['rps']:8.1f} msg/s  p50={r['p50_ms']:.1f}ms p95={r['p95_ms']:.1f}ms "
+        f"p99={r['p99_ms']:.1f}ms  errors={r['errors']}  ({r['requests']} på {r['seconds']:.2f}s)"
+    )
+
+
+async def main_async(args) -> None:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30.0) as client:
+            _print("remote", await _run(client, "/api/chat", args.n, args.c, args.sessions))
+        return
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+
+    import translation
+    from chatbot_core import warmup
+
+    # ingen cache, så hver ikke-norsk melding faktisk venter på "nettverket"
+    translation.set_translator(translation.Translator(
+        translation.FakeBackend(latency=args.latency),
+        translation.TranslationCache(max_entries=0),
+        timeout=max(2.0, args.latency * 4),
+        max_concurrency=args.c,
+    ))
+    import handler
+    _add_sync_route(handler.app)
+    warmup()
+
+    transport = httpx.ASGITransport(app=handler.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60.0) as client:
+        for mode in modes:
+            handler.SESSIONS.clear()
+            path = "/api/chat" if mode == "async" else "/loadtest/sync-chat"
+            _print(mode, await _run(client, path, args.n, args.c, args.sessions))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Lasttest for chat-API-et.")
+    parser.add_argument("--url", help="kjørende server; uten denne kjøres appen i prosessen")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("-n", type=int, default=2000, help="antall meldinger")
+    parser.add_argument("-c", type=int, default=64, help="samtidige klienter")
+    parser.add_argument("--sessions", type=int, default=500, help="antall ulike session_id")
+    parser.add_argument("--latency", type=float, default=0.05, help="falsk oversettelses-latens (s)")
+    args = parser.parse_args(argv)
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
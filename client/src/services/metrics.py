@@ -0,0 +1,171 @@
+# metrics.py
+"""
+Små, trådsikre Prometheus-metrikker uten eksterne avhengigheter.
+
+    from metrics import counter, histogram, timed
+    STAGE = histogram("chatbot_stage_seconds", "Tid pr. steg", ("stage",))
+    with timed(STAGE, "ml"):
+        ...
+    render()  # tekstformat for GET /metrics
+
+CHATBOT_METRICS=0 slår alt av: timed() gir en delt null-kontekst, og
+inc()/observe() returnerer med en gang.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+ENABLED = os.environ.get("CHATBOT_METRICS", "1") != "0"
+
+# sekunder – fra mikrosekunder (cache-treff) til sekunder (trege oversettelser)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+_NULL = nullcontext()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labelnames: tuple, values: tuple) -> str:
+    if not labelnames:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in zip(labelnames, values)) + "}"
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_fmt(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [tellinger pr. bøtte (ikke kumulativt) + +Inf, sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        if not ENABLED:
+            return
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][idx] += 1
+            series[1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for upper, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = _labels(self.labelnames + ("le",), labels + (_fmt(upper),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            base = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{base} {_fmt(total)}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist: Histogram, labels: tuple):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, *self.labels)
+        return False
+
+
+def timed(hist: Histogram, *labels):
+    """Kontekst som måler tiden i blokken inn i hist. Null-kontekst når metrikker er av."""
+    if not ENABLED:
+        return _NULL
+    return _Timer(hist, labels)
+
+
+# ===================== REGISTER =====================
+
+_METRICS: list = []
+_COLLECTORS: list = []   # funksjoner som gir ferdige linjer (verdier hentet ved scrape)
+
+
+def counter(name: str, help: str, labelnames: tuple = ()) -> Counter:
+    metric = Counter(name, help, labelnames)
+    _METRICS.append(metric)
+    return metric
+
+
+def histogram(name: str, help: str, labelnames: tuple = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    metric = Histogram(name, help, labelnames, buckets)
+    _METRICS.append(metric)
+    return metric
+
+
+def register_collector(fn) -> None:
+    """fn() -> liste med linjer i Prometheus-tekstformat, kalles ved hver render()."""
+    _COLLECTORS.append(fn)
+
+
+def gauge_lines(name: str, help: str, value: float, kind: str = "gauge") -> list[str]:
+    """Hjelper for collectors: én verdi uten labels."""
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_fmt(value)}"]
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.collect())
+    for fn in _COLLECTORS:
+        lines.extend(fn())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,230 @@
+# prefork.py
+"""
+Pre-fork-oppstart for flere workers på samme maskin.
+
+Med `uvicorn --workers N` importerer hver worker chatbot_core selv og har sin
+egen spaCy-pipeline, TF-IDF-vokabular, klassifiserer og indekser. Her lastes
+og varmes alt én gang i foreldreprosessen, objektene fryses for GC
+(gc.freeze – GC-en skriver da ikke i dem, så sidene forblir delte med
+copy-on-write), og så forkes workerne, som deler samme lyttende socket.
+
+    python prefork.py --workers 4 --port 8000
+
+Etter --report-after sekunder (og ved SIGUSR1) skrives RSS/PSS pr. worker og
+hvor mye minne som deles (fra /proc/<pid>/smaps_rollup, bare Linux).
+Dør en worker, startes en ny – med økende pause hvis den dør rett etter
+start (importfeil o.l.), så vi ikke forker i løkke. SIGTERM/SIGINT stopper alle.
+
+Hver worker åpner sin egen sesjonslagring og oversetter-cache etter fork
+(en SQLite-forbindelse kan ikke deles mellom prosesser). /metrics viser tallene for workeren som
+svarer. En tekst-reload (BOT_TEXTS_RELOAD) bygger strukturene på nytt i hver
+worker, og de nye kopiene deles ikke.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# en worker som dør før den har levd så lenge, regnes som oppstartsfeil
+RESTART_MIN_UPTIME = 10.0
+RESTART_MAX_DELAY = 30.0
+
+_SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+# ===================== MINNE =====================
+
+def memory_of(pid: int) -> dict[str, int] | None:
+    """Bytes pr. felt i /proc/<pid>/smaps_rollup, eller None hvis det ikke finnes."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    mem = {}
+    for line in lines:
+        key, _, rest = line.partition(":")
+        if key in _SMAPS_FIELDS:
+            mem[key] = int(rest.split()[0]) * 1024
+    return mem
+
+
+def memory_report(parent: int, workers: dict[int, int]) -> str:
+    """
+    Tabell over RSS/PSS/delt/privat pr. prosess. Besparelsen er summen av RSS
+    minus summen av PSS: minnet som ellers ville ligget én gang pr. worker.
+    """
+    mb = lambda b: f"{b / 2**20:8.1f}"
+    rows = [("forelder", parent)] + [(f"worker {slot}", pid) for slot, pid in sorted(workers.items())]
+    lines = [f"{'prosess':12s} {'pid':>7s} {'RSS MB':>8s} {'PSS MB':>8s} {'delt MB':>8s} {'privat MB':>9s}"]
+    total_rss = total_pss = 0
+    for name, pid in rows:
+        mem = memory_of(pid)
+        if mem is None:
+            lines.append(f"{name:12s} {pid:7d}   (ingen /proc/{pid}/smaps_rollup)")
+            continue
+        shared = mem.get("Shared_Clean", 0) + mem.get("Shared_Dirty", 0)
+        private = mem.get("Private_Clean", 0) + mem.get("Private_Dirty", 0)
+        lines.append(f"{name:12s} {pid:7d} {mb(mem['Rss'])} {mb(mem['Pss'])} {mb(shared)} {mb(private)}")
+        total_rss += mem["Rss"]
+        total_pss += mem["Pss"]
+    lines.append(
+        f"sum RSS {total_rss / 2**20:.1f} MB, sum PSS {total_pss / 2**20:.1f} MB "
+        f"-> {(total_rss - total_pss) / 2**20:.1f} MB spart ved deling"
+    )
+    return "\n".join(lines)
+
+
+# ===================== OPPSTART =====================
+
+def preload() -> dict[str, float]:
+    """Importer appen og last alt som kan deles, før fork."""
+    from chatbot_core import reload_texts, warmup
+    import handler  # noqa: F401 – appen, sesjoner og metrikker importeres her, ikke i hver worker
+    import translation
+
+    # tekster fra BOT_TEXTS_PATH før modellen trenes, så den trenes én gang og deles
+    # (lifespan i workerne ser da ingen endring)
+    if os.environ.get("BOT_TEXTS_PATH"):
+        reload_texts()
+    timings = warmup()
+    # oversetterens cache kan ha en SQLite-forbindelse – den kan ikke deles over fork,
+    # så hver worker lager sin egen oversetter ved første bruk
+    translation.reset_translator()
+    gc.collect()
+    # alt som finnes nå, flyttes ut av GC-ens generasjoner
+    gc.freeze()
+    return timings
+
+
+def _listen(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, log_level: str) -> None:
+    """Kjører i barneprosessen etter fork; returnerer aldri."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    code = 0
+    try:
+        import uvicorn
+        import handler
+
+        # sesjonslagringen (handler.sessions()) lages først her i workeren, ved første kall
+        config = uvicorn.Config(handler.app, log_level=log_level, lifespan="on")
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException as e:
+        print(f"worker {os.getpid()} feilet: {e!r}", file=sys.stderr)
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Start handler.app med pre-fork og delt modell-minne.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 2)))
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--report-after", type=float, default=10.0,
+                        help="sekunder før minnerapporten skrives (0 = bare ved SIGUSR1)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    timings = preload()
+    print(
+        f"prefork: lastet på {time.perf_counter() - t0:.2f}s ("
+        + ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in timings.items())
+        + f"), {gc.get_freeze_count()} objekter fryst"
+    )
+    sock = _listen(args.host, args.port, args.backlog)
+
+    workers: dict[int, int] = {}   # slot -> pid
+    started: dict[int, float] = {}  # slot -> når den sist ble startet
+    crashes: dict[int, int] = {}   # slot -> oppstartsfeil på rad
+    restart_at: dict[int, float] = {}  # slot -> når en død worker startes igjen
+    stopping = False
+    report_now = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(sock, args.log_level)
+        workers[slot] = pid
+        started[slot] = time.monotonic()
+
+    def on_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    def on_report(signum, frame):
+        nonlocal report_now
+        report_now = True
+
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+    signal.signal(signal.SIGUSR1, on_report)
+
+    for slot in range(args.workers):
+        spawn(slot)
+    print(f"prefork: {args.workers} workers på http://{args.host}:{args.port} (forelder {os.getpid()})")
+
+    report_at = time.monotonic() + args.report_after if args.report_after > 0 else None
+    while not stopping:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if not pid:
+                break
+            slot = next((s for s, p in workers.items() if p == pid), None)
+            if slot is None:
+                continue
+            del workers[slot]
+            now = time.monotonic()
+            crashes[slot] = crashes.get(slot, 0) + 1 if now - started[slot] < RESTART_MIN_UPTIME else 0
+            delay = min(RESTART_MAX_DELAY, 0.5 * 2 ** crashes[slot]) if crashes[slot] else 0.0
+            restart_at[slot] = now + delay
+            print(f"prefork: worker {slot} (pid {pid}) stoppet ({status}), starter ny om {delay:.1f}s")
+
+        now = time.monotonic()
+        for slot, due in list(restart_at.items()):
+            if due <= now and not stopping:
+                del restart_at[slot]
+                spawn(slot)
+
+        if report_now or (report_at is not None and time.monotonic() >= report_at):
+            report_now = False
+            report_at = None
+            print(memory_report(os.getpid(), workers), flush=True)
+        time.sleep(0.2)
+
+    for pid in workers.values():
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers.values():
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+# regression.py
+"""
+Regresjonstest for tekstbehandlingen: kjører et fast korpus gjennom norm,
+autocorrect, språkdeteksjon, nøkkelord, fuzzy-matching, ML og get_intent
+(fire kombinasjoner av state) og sammenligner med lagrede svar.
+
+Korpuset og svarene ligger i tests/data/regression.json. Svarene er laget
+med koden fra før regel-tabellen (INTENT_RULES) og er, bortsett fra
+språkdeteksjonen (lang/pick_lang, som ble poengbasert), de samme som den
+opprinnelige koden ga før fuzzy-indeksen, Levenshtein-kjernen, autocorrect-
+indeksen og frase-matcheren. En endring i reglene eller ordlistene som gir
+andre svar, vises her. Er endringen ment, lagres nye svar:
+
+    python regression.py              # sammenlign, exit 1 ved avvik
+    python regression.py --write      # lagre svarene fra gjeldende kode
+    python regression.py -v           # skriv alle avvik, ikke bare de første
+
+Like avstander i autocorrect avgjøres av rekkefølgen i sett, så alt kjøres
+med PYTHONHASHSEED=0 (skriptet starter seg selv på nytt med den om nødvendig).
+tests/test_regression.py kjører skriptet.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "data", "regression.json")
+
+# ordlistene fuzzy_includes sjekkes mot, med maks avstand 0, 1 og 2
+FUZZY_LISTS = (
+    "ADMIN_WORDS", "DOMAIN_WORDS", "FAREWELL_WORDS", "GAMEPLAY_WORDS", "GREET_WORDS",
+    "NO_WORDS", "RELEASE_QUESTION_WORDS", "RELEASE_WORDS", "THANK_WORDS", "YES_WORDS",
+)
+# (awaiting_ticket_confirm, last_topic) get_intent kjøres med
+INTENT_STATES = ((False, None), (False, "vote"), (True, None), (True, "vote"))
+
+
+def evaluate(text: str) -> dict:
+    """Alt vi sammenligner for én melding."""
+    import bot_texts
+    import chatbot_core as core
+
+    tags, tokens, is_question = core.extract_keywords(text)
+    row = {
+        "norm": core.norm(text),
+        "autocorrect": core.autocorrect_text(text),
+        "lang": core.detect_lang_rule(text),
+        "keywords": [sorted(tags), list(tokens), is_question],
+        "fuzzy": "".join(
+            "1" if core.fuzzy_includes(text, getattr(bot_texts, name), d) else "0"
+            for name in FUZZY_LISTS for d in (0, 1, 2)
+        ),
+        "ml": core.ml_predict_intent(text),
+        "intent": [
+            core.get_intent(text, core.ChatState(awaiting_ticket_confirm=aw, last_topic=topic))
+            for aw, topic in INTENT_STATES
+        ],
+    }
+    state = core.ChatState()
+    row["pick_lang"] = [core.pick_lang_for_message(x, state) for x in (text, "hei", text, "hello there")]
+
+    # en liten samtale: meldingen, "ja", meldingen igjen (svartekstene er tilfeldige/oversatte og tas ikke med)
+    random.seed(7)
+    state = core.ChatState()
+    turns = []
+    for x in (text, "ja", text):
+        result, state = core.handle_message(x, state)
+        turns.append([result["intent"], result["lang"], result["awaiting_ticket_confirm"], result["last_topic"]])
+    row["conversation"] = turns
+    return row
+
+
+def levenshtein_table(corpus: list[str]) -> list[int]:
+    import chatbot_core as core
+
+    words = sorted({w for text in corpus for w in core.norm(text).split()})[:200]
+    return [core.levenshtein(a, b) for a in words[:40] for b in words]
+
+
+def run(corpus: list[str]) -> dict:
+    import translation
+
+    # ingen oversettelse (som uten deep_translator) – ingen nettverk, samme svar hver gang
+    translation.set_translator(translation.Translator(None, translation.TranslationCache(max_entries=0)))
+    return {
+        "rows": [evaluate(text) for text in corpus],
+        "levenshtein": levenshtein_table(corpus),
+    }
+
+
+def compare(expected: dict, actual: dict) -> list[str]:
+    """Avvik som lesbare linjer (tom liste = likt)."""
+    diffs = []
+    for text, want, got in zip(expected["corpus"], expected["rows"], actual["rows"]):
+        for key, value in want.items():
+            if got.get(key) != value:
+                diffs.append(f"{text!r} {key}: forventet {value!r}, fikk {got.get(key)!r}")
+    if expected["levenshtein"] != actual["levenshtein"]:
+        bad = sum(a != b for a, b in zip(expected["levenshtein"], actual["levenshtein"]))
+        diffs.append(f"levenshtein: {bad} av {len(expected['levenshtein'])} avstander er ulike")
+    return diffs
+
+
+def load(path: str = DATA_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sammenlign tekstbehandlingen med lagrede svar.")
+    parser.add_argument("--data", default=DATA_PATH, help="korpus og forventede svar (JSON)")
+    parser.add_argument("--write", action="store_true", help="lagre svarene fra gjeldende kode i --data")
+    parser.add_argument("-v", "--verbose", action="store_true", help="skriv alle avvik")
+    args = parser.parse_args(argv)
+
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        env = dict(os.environ, PYTHONHASHSEED="0")
+        os.execve(sys.executable, [sys.executable, os.path.abspath(__file__), *(argv or [])], env)
+
+    data = load(args.data)
+    actual = run(data["corpus"])
+
+    if args.write:
+        data.update(actual)
+        with open(args.data, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=0)
+            f.write("\n")
+        print(f"lagret {len(data['rows'])} meldinger i {args.data}")
+        return 0
+
+    diffs = compare(data, actual)
+    for line in diffs if args.verbose else diffs[:20]:
+        print(line)
+    print(f"{len(data['corpus'])} meldinger, {len(diffs)} avvik")
+    return 1 if diffs else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
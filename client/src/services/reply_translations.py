@@ -0,0 +1,110 @@
+# reply_translations.py
+"""
+Ferdig-oversatte REPLY_TEMPLATES pr. språk.
+
+Svarene er et lite, fast sett, så i stedet for å oversette hvert svar live
+bygger vi en tabell én gang (offline / ved deploy) og lagrer den som
+reply_templates.json ved siden av bot_texts.py:
+
+    python reply_translations.py              # alle språk i LANG_ORDER
+    python reply_translations.py --langs en,de
+
+Tabellen er merket med en hash av REPLY_TEMPLATES – endres tekstene,
+ignoreres den gamle tabellen til den bygges på nytt.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+FORMAT_VERSION = 1
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reply_templates.json")
+
+
+def templates_hash(templates: dict) -> str:
+    """Stabil hash av REPLY_TEMPLATES (brukes som versjon på tabellen)."""
+    payload = json.dumps(templates, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def translate_templates(templates: dict, lang: str, backend) -> dict:
+    """Oversett alle templates til lang. Feil i backend kastes videre."""
+    out = {}
+    for intent, value in templates.items():
+        if isinstance(value, list):
+            out[intent] = [backend.translate(t, "no", lang) for t in value]
+        else:
+            out[intent] = backend.translate(value, "no", lang)
+    return out
+
+
+def build_reply_table(templates: dict, langs, backend, log=print) -> dict:
+    """
+    Bygg {"version", "templates_hash", "languages": {lang: templates}}.
+    Et språk der én eller flere oversettelser feiler hoppes over i sin helhet,
+    så tabellen aldri har halvferdige språk.
+    """
+    languages = {}
+    for lang in langs:
+        if lang == "no":
+            continue
+        try:
+            languages[lang] = translate_templates(templates, lang, backend)
+        except Exception as exc:
+            log(f"hopper over {lang}: {exc}")
+    return {
+        "version": FORMAT_VERSION,
+        "templates_hash": templates_hash(templates),
+        "languages": languages,
+    }
+
+
+def save_reply_table(table: dict, path: str = DEFAULT_PATH) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_reply_table(templates: dict, path: str = DEFAULT_PATH) -> dict[str, dict]:
+    """
+    {lang: templates} fra fil, eller {} hvis filen mangler, er ødelagt
+    eller ble bygget fra andre REPLY_TEMPLATES enn de vi har nå.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if table.get("version") != FORMAT_VERSION:
+        return {}
+    if table.get("templates_hash") != templates_hash(templates):
+        return {}
+    return table.get("languages") or {}
+
+
+def main(argv=None) -> int:
+    from bot_texts import REPLY_TEMPLATES
+    from chatbot_core import LANG_ORDER
+    from translation import default_backend
+
+    parser = argparse.ArgumentParser(description="Forhåndsoversett REPLY_TEMPLATES.")
+    parser.add_argument("--langs", default=",".join(l for l in LANG_ORDER if l != "no"))
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    backend = default_backend()
+    if backend is None:
+        print("deep_translator er ikke installert – kan ikke oversette.", file=sys.stderr)
+        return 1
+
+    langs = [l.strip() for l in args.langs.split(",") if l.strip()]
+    table = build_reply_table(REPLY_TEMPLATES, langs, backend)
+    save_reply_table(table, args.out)
+    print(f"skrev {len(table['languages'])} språk til {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+# retrieval_index.py
+"""
+TF-IDF-indeks for spørsmål/svar-par (brukes av holder.SimpleRetrievalBot).
+
+Samme vekting som TfidfVectorizer(ngram_range=(1, 2)) + cosine_similarity,
+men som en invertert indeks:
+  - søk går bare gjennom postinglistene til ordene i spørsmålet, sjeldneste
+    ord først. Postinglistene er sortert på vekt, så for vanlige ord leser vi
+    bare toppen – resten kan ikke lenger løfte et nytt dokument inn i topp-k
+  - add/remove av enkeltpar uten å tilpasse alt på nytt
+  - save/load til JSON
+
+Idf endrer seg når antall par endres. Dokumentvektene regnes derfor på nytt
+(refresh) først når antallet har endret seg med mer enn refresh_ratio siden
+sist, så add/remove er billig i snitt. Rett etter refresh() er scorene de
+samme som med sklearn; mellom to refresh er idf for eldre par litt utdatert.
+"""
+import bisect
+import heapq
+import json
+import math
+import os
+import re
+from dataclasses import dataclass
+
+FORMAT_VERSION = 1
+
+# samme som TfidfVectorizer sin standard token_pattern
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+@dataclass(frozen=True, slots=True)
+class Hit:
+    doc_id: int
+    score: float
+    question: str
+    answer: str
+
+
+def analyze(text: str, ngram_range: tuple[int, int] = (1, 2)) -> dict[str, int]:
+    """Antall forekomster pr. n-gram, som TfidfVectorizer sin analyzer (lowercase)."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    lo, hi = ngram_range
+    counts: dict[str, int] = {}
+    for n in range(lo, hi + 1):
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i] if n == 1 else " ".join(tokens[i:i + n])
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+class RetrievalIndex:
+    def __init__(self, ngram_range: tuple[int, int] = (1, 2), refresh_ratio: float = 0.1):
+        self.ngram_range = tuple(ngram_range)
+        self.refresh_ratio = refresh_ratio
+
+        self._questions: dict[int, str] = {}
+        self._answers: dict[int, str] = {}
+        self._counts: dict[int, dict[str, int]] = {}   # doc -> n-gram -> antall
+        self._df: dict[str, int] = {}
+        self._postings: dict[str, dict[int, float]] = {}  # n-gram -> doc -> normalisert vekt
+        self._by_weight: dict[str, list[tuple[float, int]]] = {}  # n-gram -> [(-vekt, doc)], tyngst først
+        self._next_id = 0
+        self._n_at_refresh = 0
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._questions
+
+    def idf(self, term: str) -> float:
+        """Glattet idf som i sklearn: ln((1 + n) / (1 + df)) + 1."""
+        return math.log((1 + len(self._questions)) / (1 + self._df.get(term, 0))) + 1.0
+
+    # ----- endringer -----
+
+    def add(self, question: str, answer: str) -> int:
+        doc_id = self._insert(question, answer)
+        self._index_doc(doc_id)
+        self._maybe_refresh()
+        return doc_id
+
+    def add_many(self, pairs) -> list[int]:
+        """Legg til mange par og regn vektene på nytt én gang til slutt."""
+        ids = [self._insert(q, a) for q, a in pairs]
+        self.refresh()
+        return ids
+
+    def remove(self, doc_id: int) -> bool:
+        counts = self._counts.pop(doc_id, None)
+        if counts is None:
+            return False
+        del self._questions[doc_id]
+        del self._answers[doc_id]
+        for term in counts:
+            postings = self._postings.get(term)
+            if postings is not None and doc_id in postings:
+                entries = self._by_weight[term]
+                del entries[bisect.bisect_left(entries, (-postings.pop(doc_id), doc_id))]
+                if not postings:
+                    del self._postings[term]
+                    del self._by_weight[term]
+            df = self._df[term] - 1
+            if df:
+                self._df[term] = df
+            else:
+                del self._df[term]
+        self._maybe_refresh()
+        return True
+
+    def _insert(self, question: str, answer: str) -> int:
+        doc_id = self._next_id
+        self._next_id += 1
+        counts = analyze(question, self.ngram_range)
+        self._questions[doc_id] = question
+        self._answers[doc_id] = answer
+        self._counts[doc_id] = counts
+        for term in counts:
+            self._df[term] = self._df.get(term, 0) + 1
+        return doc_id
+
+    def _index_doc(self, doc_id: int) -> None:
+        counts = self._counts[doc_id]
+        weights = {t: c * self.idf(t) for t, c in counts.items()}
+        length = math.sqrt(sum(w * w for w in weights.values()))
+        if not length:
+            return
+        for term, w in weights.items():
+            w /= length
+            self._postings.setdefault(term, {})[doc_id] = w
+            bisect.insort(self._by_weight.setdefault(term, []), (-w, doc_id))
+
+    def _maybe_refresh(self) -> None:
+        n = len(self._questions)
+        if abs(n - self._n_at_refresh) > self.refresh_ratio * self._n_at_refresh:
+            self.refresh()
+
+    def refresh(self) -> None:
+        """Regn alle dokumentvekter på nytt med dagens idf."""
+        postings: dict[str, dict[int, float]] = {}
+        for doc_id, counts in self._counts.items():
+            weights = {t: c * self.idf(t) for t, c in counts.items()}
+            length = math.sqrt(sum(w * w for w in weights.values()))
+            if length:
+                for term, w in weights.items():
+                    postings.setdefault(term, {})[doc_id] = w / length
+        self._postings = postings
+        self._by_weight = {t: sorted((-w, d) for d, w in p.items()) for t, p in postings.items()}
+        self._n_at_refresh = len(self._questions)
+
+    # ----- søk -----
+
+    def search(self, text: str, k: int = 5, min_score: float = 0.0) -> list[Hit]:
+        """De k mest like parene med cosinus-score >= min_score, best først."""
+        if k <= 0:
+            return []
+        # spørsmålsvektor over n-gram indeksen kjenner (ukjente ord teller ikke, som i sklearn)
+        query = {
+            t: c * self.idf(t)
+            for t, c in analyze(text, self.ngram_range).items()
+            if t in self._postings
+        }
+        length = math.sqrt(sum(w * w for w in query.values()))
+        if not length:
+            return []
+
+        # sjeldneste ord (høyest spørsmålsvekt) først; after[i] = maks bidrag fra ledd etter i
+        terms = sorted(((qw / length, t) for t, qw in query.items()), reverse=True)
+        bounds = [qw * -self._by_weight[t][0][0] for qw, t in terms]
+        after = [0.0] * len(terms)
+        for i in range(len(terms) - 2, -1, -1):
+            after[i] = after[i + 1] + bounds[i + 1]
+
+        scores: dict[int, float] = {}
+        for i, (qw, term) in enumerate(terms):
+            threshold = min_score
+            if len(scores) >= k:
+                threshold = max(threshold, heapq.nlargest(k, scores.values())[-1])
+            # kandidater som ikke når terskelen selv med maks fra resten av leddene, kastes
+            cutoff = threshold - bounds[i] - after[i]
+            if cutoff > 0 and scores:
+                scores = {d: sc for d, sc in scores.items() if sc >= cutoff}
+            # et dokument som ikke er kandidat ennå, må få minst dette fra leddet for å kunne nå topp-k
+            needed = threshold - after[i]
+            seen = set()
+            for neg_w, doc_id in self._by_weight[term]:
+                contrib = qw * -neg_w
+                if contrib < needed:
+                    break
+                scores[doc_id] = scores.get(doc_id, 0.0) + contrib
+                seen.add(doc_id)
+            else:
+                continue
+            # resten av listen: bare kandidatene vi allerede har trenger bidraget
+            postings = self._postings[term]
+            for doc_id in scores:
+                if doc_id not in seen:
+                    w = postings.get(doc_id)
+                    if w is not None:
+                        scores[doc_id] += qw * w
+
+        best = heapq.nlargest(k, scores.items(), key=lambda x: (x[1], -x[0]))
+        return [
+            Hit(doc_id, score, self._questions[doc_id], self._answers[doc_id])
+            for doc_id, score in best
+            if score >= min_score
+        ]
+
+    # ----- lagring -----
+
+    def save(self, path: str) -> None:
+        """Skriv parene og n-gram-tellingene atomisk; vektene regnes ut ved load."""
+        data = {
+            "version": FORMAT_VERSION,
+            "ngram_range": list(self.ngram_range),
+            "refresh_ratio": self.refresh_ratio,
+            "next_id": self._next_id,
+            "docs": [
+                [doc_id, self._questions[doc_id], self._answers[doc_id], self._counts[doc_id]]
+                for doc_id in self._questions
+            ],
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RetrievalIndex":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: ukjent indeksformat {data.get('version')!r}")
+        index = cls(tuple(data["ngram_range"]), data["refresh_ratio"])
+        for doc_id, question, answer, counts in data["docs"]:
+            index._questions[doc_id] = question
+            index._answers[doc_id] = answer
+            index._counts[doc_id] = counts
+            for term in counts:
+                index._df[term] = index._df.get(term, 0) + 1
+        index._next_id = data["next_id"]
+        index.refresh()
+        return index
@@ -0,0 +1,81 @@
+# rule_engine.py
+"""
+Deklarative regler for intent-valg (brukes av chatbot_core.get_intent).
+
+En regel sier: hvis alle features i all_of er sanne, minst én i any_of (hvis
+satt) og ingen i none_of – gi intent. Reglene prøves i prioritets-rekkefølge
+og den første som treffer vinner.
+
+Features er navngitte funksjoner ctx -> bool. RuleEngine slår opp navnene
+én gang (compile), og under evaluering regnes hver feature høyst én gang pr.
+melding, og bare hvis en regel faktisk trenger den. En ny regel som bruker
+eksisterende features koster altså ingenting før den nås.
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True, slots=True)
+class Rule:
+    priority: int
+    branch: str                          # navn i metrikker / feilsøking
+    intent: str | Callable               # fast intent, eller ctx -> intent
+    all_of: tuple[str, ...] = ()
+    any_of: tuple[str, ...] = ()
+    none_of: tuple[str, ...] = ()
+
+
+class RuleEngine:
+    def __init__(self, rules, features: dict[str, Callable], default: Rule):
+        self.rules = sorted(rules, key=lambda r: r.priority)
+        self.default = default
+
+        # hver gren må kunne skilles fra de andre i chatbot_intent_branch_total
+        branches = [r.branch for r in (*self.rules, default)]
+        duplicates = sorted({b for b in branches if branches.count(b) > 1})
+        if duplicates:
+            raise ValueError(f"grennavn brukt av flere regler: {', '.join(duplicates)}")
+
+        names = sorted({n for r in self.rules for n in (*r.all_of, *r.any_of, *r.none_of)})
+        unknown = [n for n in names if n not in features]
+        if unknown:
+            raise ValueError(f"ukjente features i regler: {', '.join(unknown)}")
+        slot = {n: i for i, n in enumerate(names)}
+        self.feature_names = tuple(names)
+        self._funcs = tuple(features[n] for n in names)
+        self._compiled = tuple(
+            (
+                tuple(slot[n] for n in r.all_of),
+                tuple(slot[n] for n in r.any_of),
+                tuple(slot[n] for n in r.none_of),
+                r,
+            )
+            for r in self.rules
+        )
+
+    def match(self, ctx) -> Rule:
+        """Første regel (etter prioritet) som treffer, ellers default."""
+        funcs = self._funcs
+        values: list = [None] * len(funcs)
+
+        def feature(i: int) -> bool:
+            v = values[i]
+            if v is None:
+                v = values[i] = bool(funcs[i](ctx))
+            return v
+
+        for all_of, any_of, none_of, rule in self._compiled:
+            if not all(feature(i) for i in all_of):
+                continue
+            if any_of and not any(feature(i) for i in any_of):
+                continue
+            if any(feature(i) for i in none_of):
+                continue
+            return rule
+        return self.default
+
+    def evaluate(self, ctx) -> tuple[str, str]:
+        """(branch, intent) for ctx."""
+        rule = self.match(ctx)
+        intent = rule.intent(ctx) if callable(rule.intent) else rule.intent
+        return rule.branch, intent
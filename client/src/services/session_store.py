@@ -0,0 +1,276 @@
+# session_store.py
+"""
+Lagring av ChatState pr. session_id for handler.py.
+
+To varianter med samme grensesnitt (get / put / delete / stats):
+  MemorySessionStore   LRU i minnet + utløp etter inaktivitet (én prosess)
+  SQLiteSessionStore   SQLite-fil – delt mellom flere uvicorn-workers på samme
+                       maskin, så en sesjon ikke trenger sticky routing
+
+Begge har maks antall sesjoner og idle-TTL, og teller utkastelser.
+`blocking` sier om kallene gjør disk-I/O (og bør kjøres utenfor event-loopen).
+SessionLocks gir én asyncio.Lock pr. session_id for async-endepunktene.
+
+Konfig via miljøvariabler (session_store_from_env):
+  SESSION_MAX_COUNT    maks antall sesjoner (standard 10000)
+  SESSION_IDLE_TTL     sekunder uten aktivitet før en sesjon kastes (standard 2 timer)
+  SESSION_STORE_PATH   SQLite-fil – hvis satt brukes SQLiteSessionStore
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from chatbot_core import ChatState
+
+
+# ===================== SERIALISERING =====================
+
+def encode_state(state: ChatState) -> bytes:
+    return state.to_bytes()
+
+
+def decode_state(data: bytes) -> ChatState:
+    return ChatState.from_bytes(data)
+
+
+def _state_size(state: ChatState) -> int:
+    """Omtrentlig antall bytes en ChatState holder på (objekt + historikk)."""
+    # str-feltene er delte konstanter (VIEW_VALUES osv.) og telles ikke
+    return sys.getsizeof(state) + sys.getsizeof(state.lang_codes)
+
+
+# ===================== MINNE =====================
+
+class MemorySessionStore:
+    """
+    LRU med maks max_sessions sesjoner. En sesjon som ikke er brukt på
+    idle_ttl sekunder regnes som borte og kastes ved neste oppslag/lagring.
+    get() gir samme ChatState-objekt tilbake, så endringer i den er synlige med en gang.
+    """
+
+    blocking = False
+
+    def __init__(self, max_sessions: int = 10_000, idle_ttl: float = 2 * 3600, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._sessions: OrderedDict[str, tuple[ChatState, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> ChatState | None:
+        now = self._clock()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                state, last_seen = entry
+                if now - last_seen <= self.idle_ttl:
+                    self._sessions[session_id] = (state, now)
+                    self._sessions.move_to_end(session_id)
+                    self.hits += 1
+                    return state
+                del self._sessions[session_id]
+                self.ttl_evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, session_id: str, state: ChatState) -> None:
+        now = self._clock()
+        with self._lock:
+            self._sessions[session_id] = (state, now)
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        # eldst brukt ligger først – utløpte sesjoner ligger alltid foran de aktive
+        sessions = self._sessions
+        while sessions:
+            _, last_seen = next(iter(sessions.values()))
+            if now - last_seen <= self.idle_ttl:
+                break
+            sessions.popitem(last=False)
+            self.ttl_evictions += 1
+        while len(sessions) > self.max_sessions:
+            sessions.popitem(last=False)
+            self.lru_evictions += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            states = [state for state, _ in self._sessions.values()]
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "sessions": len(states),
+            "approx_bytes": sum(_state_size(s) for s in states),
+            "hits": self.hits,
+            "misses": self.misses,
+            "lru_evictions": self.lru_evictions,
+            "ttl_evictions": self.ttl_evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# ===================== SQLITE =====================
+
+class SQLiteSessionStore:
+    """
+    Sesjoner i en SQLite-fil (WAL), så flere prosesser kan dele dem.
+    get() gir en ny ChatState hver gang – husk put() etter endringer.
+    To samtidige meldinger i samme sesjon på ulike workers: sist lagret vinner.
+    """
+
+    blocking = True  # spørring + commit pr. kall
+
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int = 10_000,
+        idle_ttl: float = 2 * 3600,
+        clock=time.time,
+    ):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._clock = clock  # veggklokke – deles mellom prosesser
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, state BLOB, last_seen REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+        self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get(self, session_id: str) -> ChatState | None:
+        now = self._clock()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state FROM sessions WHERE session_id=? AND last_seen >= ?",
+                (session_id, now - self.idle_ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+        try:
+            state = decode_state(row[0])
+        except ValueError:
+            # lagret med koder denne versjonen ikke kjenner – start sesjonen på nytt
+            self.misses += 1
+            return None
+        self.hits += 1
+        return state
+
+    def put(self, session_id: str, state: ChatState) -> None:
+        data = encode_state(state)
+        now = self._clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (session_id, data, now),
+            )
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 100:
+                self._prune(now)
+            self._db.commit()
+
+    def _prune(self, now: float) -> None:
+        self._puts_since_prune = 0
+        cur = self._db.execute("DELETE FROM sessions WHERE last_seen < ?", (now - self.idle_ttl,))
+        self.ttl_evictions += cur.rowcount
+        cur = self._db.execute(
+            "DELETE FROM sessions WHERE rowid IN ("
+            " SELECT rowid FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+        self.lru_evictions += cur.rowcount
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE session_id=?", (session_id,))
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            pages = self._db.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._db.execute("PRAGMA page_size").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "sessions": count,
+            "approx_bytes": pages * page_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "lru_evictions": self.lru_evictions,
+            "ttl_evictions": self.ttl_evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def session_store_from_env():
+    max_sessions = int(os.environ.get("SESSION_MAX_COUNT", 10_000))
+    idle_ttl = float(os.environ.get("SESSION_IDLE_TTL", 2 * 3600))
+    path = os.environ.get("SESSION_STORE_PATH") or None
+    if path:
+        return SQLiteSessionStore(path, max_sessions=max_sessions, idle_ttl=idle_ttl)
+    return MemorySessionStore(max_sessions=max_sessions, idle_ttl=idle_ttl)
+
+
+# ===================== LÅSER =====================
+
+class SessionLocks:
+    """
+    Én asyncio.Lock pr. session_id, så to samtidige meldinger i samme sesjon
+    ikke endrer samme ChatState om hverandre. Låser ingen holder eller venter
+    på forsvinner av seg selv (weakref), så dette vokser ikke med antall sesjoner.
+    Gjelder bare innenfor én prosess.
+    """
+
+    def __init__(self):
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
@@ -0,0 +1,5 @@
+# tjenestemodulene importeres flatt (import chatbot_core osv.), som når de kjøres fra services/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
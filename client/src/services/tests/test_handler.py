@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+
+import handler
+
+
+def test_ws_invalid_frame_gets_error_and_stays_open():
+    with TestClient(handler.app) as client:
+        with client.websocket_connect("/api/chat/ws") as ws:
+            ws.send_text("ikke json")
+            assert ws.receive_json()["type"] == "error"
+            ws.send_json(["feil", "form"])
+            assert ws.receive_json()["type"] == "error"
+            ws.send_json({"text": "hei"})
+            reply = ws.receive_json()
+            assert reply["type"] == "reply" and reply["intent"] == "greeting"
+
+
+def test_app_survives_a_second_lifespan():
+    for _ in range(2):
+        with TestClient(handler.app) as client:
+            resp = client.post("/api/chat", json={"session_id": "s", "text": "hei"})
+            assert resp.status_code == 200
+
+
+def test_ws_binary_frames():
+    with TestClient(handler.app) as client:
+        with client.websocket_connect("/api/chat/ws") as ws:
+            ws.send_bytes(b"\xff\xfe")
+            assert ws.receive_json()["type"] == "error"
+            ws.send_bytes('{"text": "hei"}'.encode("utf-8"))
+            reply = ws.receive_json()
+            assert reply["type"] == "reply" and reply["intent"] == "greeting"
+
+
+def test_sqlite_sessions_are_used_off_the_event_loop(tmp_path, monkeypatch):
+    import threading
+
+    from session_store import SQLiteSessionStore
+
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    threads = []
+    get, put = store.get, store.put
+    monkeypatch.setattr(store, "get", lambda sid: threads.append(threading.current_thread()) or get(sid))
+    monkeypatch.setattr(store, "put", lambda sid, st: threads.append(threading.current_thread()) or put(sid, st))
+    monkeypatch.setattr(handler, "SESSIONS", store)
+
+    with TestClient(handler.app) as client:
+        loop_thread = client.portal.call(threading.current_thread)
+        assert client.post("/api/chat", json={"session_id": "s", "text": "hei"}).status_code == 200
+        resp = client.post("/api/chat/batch", json={"messages": [
+            {"session_id": "s", "text": "hva koster vote"}, {"session_id": "t", "text": "hei"},
+        ]})
+        assert resp.status_code == 200
+    assert threads and loop_thread not in threads
+    assert store.get("s") is not None and store.get("t") is not None
@@ -0,0 +1,16 @@
+import chatbot_core as core
+
+
+def test_cache_hit_counts_original_branch():
+    state = core.ChatState()
+    core.INTENT_CACHE.clear()
+    intent = core.get_intent("hva koster vote", state)
+    key = ("hva koster vote", state.awaiting_ticket_confirm, state.last_topic)
+    cached_intent, branch = core.INTENT_CACHE.get(key, core.intent_cache_version())
+    assert cached_intent == intent
+
+    before = core.INTENT_BRANCHES.value(branch)
+    before_cache = core.INTENT_BRANCHES.value("cache")
+    assert core.get_intent("hva koster vote", state) == intent
+    assert core.INTENT_BRANCHES.value(branch) == before + 1
+    assert core.INTENT_BRANCHES.value("cache") == before_cache == 0
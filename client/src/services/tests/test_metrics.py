@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+import handler
+import metrics
+
+
+def test_metrics_endpoint_reports_stages_branches_and_requests():
+    with TestClient(handler.app) as client:
+        chat = client.post("/api/chat", json={"session_id": "m", "text": "hei"})
+        assert chat.status_code == 200
+        resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert 'chatbot_stage_seconds_count{stage="intent"}' in body
+    assert f'chatbot_intent_total{{intent="{chat.json()["intent"]}"}}' in body
+    assert "# TYPE chatbot_intent_branch_total counter" in body
+    assert 'chatbot_http_request_seconds_count{path="/api/chat",status="200"}' in body
+    assert "chatbot_sessions " in body
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    c = metrics.Counter("test_total", "test", ("x",))
+    h = metrics.Histogram("test_seconds", "test")
+    c.inc("a")
+    h.observe(0.1)
+    with metrics.timed(h):
+        pass
+    assert c.value("a") == 0
+    assert h.count() == 0
+    assert metrics.timed(h) is metrics.timed(h)  # delt null-kontekst
+
+
+def test_chatbot_metrics_env_turns_metrics_off():
+    services = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-c", "import metrics; print(metrics.ENABLED)"],
+        cwd=services, env=dict(os.environ, CHATBOT_METRICS="0"), capture_output=True, text=True,
+    )
+    assert proc.stdout.strip() == "False"
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+SERVICES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_preload_opens_no_sqlite_connections(tmp_path):
+    # egen prosess: preload() fryser GC og bytter global oversetter
+    code = (
+        "import handler, prefork, translation\n"
+        "prefork.preload()\n"
+        "assert handler.SESSIONS is None, handler.SESSIONS\n"
+        "assert translation.TRANSLATOR is None\n"
+    )
+    env = dict(
+        os.environ,
+        SESSION_STORE_PATH=str(tmp_path / "sessions.db"),
+        TRANSLATION_CACHE_PATH=str(tmp_path / "translations.db"),
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=SERVICES, env=env, capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+import regression
+
+
+def test_corpus_matches_recorded_answers():
+    # eget prosess: svarene forutsetter PYTHONHASHSEED=0 (se regression.py)
+    proc = subprocess.run(
+        [sys.executable, regression.__file__],
+        capture_output=True, text=True, timeout=300,
+        cwd=os.path.dirname(regression.__file__),
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    assert " 0 avvik" in proc.stdout
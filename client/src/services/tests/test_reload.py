@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+import bot_texts
+import chatbot_core
+from chatbot_core import ChatState, get_intent, reload_texts
+
+
+@pytest.fixture
+def texts_file(tmp_path):
+    path = tmp_path / "texts.json"
+    yield path
+    reload_texts(bot_texts.__file__)  # tilbake til bot_texts.py
+
+
+def test_reload_rebuilds_only_changed(texts_file):
+    texts_file.write_text(json.dumps({"GREET_WORDS": ["hei", "morn"]}), encoding="utf-8")
+    swapped = reload_texts(str(texts_file))
+    assert "FZ_GREET" in swapped and "GREET_WORDS" in swapped
+    assert "AUTOCORRECT_INDEX" not in swapped and "ML_CLASSIFIER" not in swapped
+    assert get_intent("morn", ChatState()) == "greeting"
+    assert reload_texts(str(texts_file)) == []
+
+
+def test_reload_rejects_language_without_code(texts_file):
+    hints = dict(bot_texts.LANG_HINT_WORDS, it=["ciao", "prezzo", "aiuto"])
+    texts_file.write_text(json.dumps({"LANG_HINT_WORDS": hints}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        reload_texts(str(texts_file))
+    assert "it" not in chatbot_core.LANG_ORDER
+    assert "it" not in chatbot_core.LANG_LEXICON.get("ciao", {})
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from retrieval_index import RetrievalIndex, analyze
+
+WORDS = (
+    "vote spill pris lansering team support ticket hjelp konto feil vintra studio "
+    "gameplay server passord betaling refusjon lagring grafikk lyd kontroller"
+).split()
+
+
+def _pairs(n, seed=0):
+    rnd = random.Random(seed)
+    return [
+        (" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 7))), f"svar {i}")
+        for i in range(n)
+    ]
+
+
+def _exhaustive(index, text, k):
+    """Topp-k ved å regne ut scoren for hvert dokument med indeksens nåværende vekter (ingen beskjæring)."""
+    query = {t: c * index.idf(t) for t, c in analyze(text, index.ngram_range).items() if t in index._postings}
+    length = sum(w * w for w in query.values()) ** 0.5
+    if not length:
+        return []
+    scores = {}
+    for term, qw in query.items():
+        for doc_id, w in index._postings[term].items():
+            scores[doc_id] = scores.get(doc_id, 0.0) + qw / length * w
+    best = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:k]
+    return [(d, pytest.approx(s)) for d, s in best]
+
+
+def _hits(index, text, k):
+    return [(h.doc_id, h.score) for h in index.search(text, k)]
+
+
+def test_incremental_add_remove_matches_exhaustive_search():
+    rnd = random.Random(1)
+    index = RetrievalIndex()
+    ids = index.add_many(_pairs(200))
+    for question, answer in _pairs(60, seed=2):
+        ids.append(index.add(question, answer))
+        if rnd.random() < 0.5:
+            victim = ids.pop(rnd.randrange(len(ids)))
+            assert index.remove(victim)
+            assert victim not in index
+    assert not index.remove(-1)
+    assert len(index) == len(ids)
+
+    # vektene kan være fra før siste refresh – søket skal likevel gi eksakt topp-k for dem
+    for question, _ in _pairs(50, seed=3):
+        assert _hits(index, question, 5) == _exhaustive(index, question, 5)
+
+
+def test_refresh_gives_same_scores_as_a_fresh_index():
+    pairs = _pairs(120)
+    index = RetrievalIndex()
+    ids = index.add_many(pairs[:100])
+    for question, answer in pairs[100:]:
+        ids.append(index.add(question, answer))
+    for doc_id in ids[:30]:
+        index.remove(doc_id)
+    index.refresh()
+
+    fresh = RetrievalIndex()
+    fresh.add_many(pairs[30:])
+    for question, _ in _pairs(30, seed=4):
+        got = [(h.answer, h.score) for h in index.search(question, 5)]
+        want = [(h.answer, pytest.approx(h.score)) for h in fresh.search(question, 5)]
+        assert got == want
+
+
+def test_save_load_round_trip(tmp_path):
+    index = RetrievalIndex(refresh_ratio=0.5)
+    ids = index.add_many(_pairs(80))
+    index.remove(ids[3])
+    index.refresh()
+    path = str(tmp_path / "index.json")
+    index.save(path)
+
+    loaded = RetrievalIndex.load(path)
+    assert len(loaded) == len(index) and ids[3] not in loaded
+    assert loaded.refresh_ratio == 0.5
+    for question, _ in _pairs(20, seed=5):
+        assert _hits(loaded, question, 5) == [(d, pytest.approx(s)) for d, s in _hits(index, question, 5)]
+    # nye id-er fortsetter der den lagrede sluttet
+    assert loaded.add("ny", "svar") == index.add("ny", "svar")
+
+
+def test_scores_match_sklearn():
+    pytest.importorskip("sklearn")
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    pairs = _pairs(150)
+    index = RetrievalIndex()
+    index.add_many(pairs)
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+    matrix = vectorizer.fit_transform([q for q, _ in pairs])
+    for question, _ in _pairs(30, seed=6):
+        sims = cosine_similarity(vectorizer.transform([question]), matrix)[0]
+        want = sorted(((i, s) for i, s in enumerate(sims) if s > 0), key=lambda x: (-x[1], x[0]))[:5]
+        assert _hits(index, question, 5) == [(i, pytest.approx(s)) for i, s in want]
@@ -0,0 +1,19 @@
+import pytest
+
+import chatbot_core as core
+from rule_engine import Rule, RuleEngine
+
+
+def test_branch_names_must_be_unique():
+    rules = [Rule(10, "a", "x", all_of=("f",)), Rule(20, "a", "y", all_of=("f",))]
+    with pytest.raises(ValueError, match="a"):
+        RuleEngine(rules, {"f": lambda ctx: True}, default=Rule(1000, "other", "other"))
+
+
+@pytest.mark.parametrize("text, branch", [
+    ("hva er vote?", "what_is_vote"),            # fast frase
+    ("hvem står bak vote?", "what_is_vote_question"),  # domene + spørsmål
+])
+def test_what_is_vote_branches_are_told_apart(text, branch):
+    msg = core.autocorrect_message(core.parse_message(text))
+    assert core.INTENT_ENGINE.evaluate(core._RuleContext(msg, core.ChatState())) == (branch, "what_is_vote")
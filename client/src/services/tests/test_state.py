@@ -0,0 +1,35 @@
+import pytest
+
+from chatbot_core import LANG_VALUES, ChatState
+
+
+def test_round_trip():
+    state = ChatState(awaiting_ticket_confirm=True, active_view="createTicket", last_topic="vote", user_lang="de")
+    for lang in ("no", "en", "de"):
+        state.remember_lang(lang)
+    assert ChatState.from_bytes(state.to_bytes()) == state
+
+
+def test_lang_codes_are_fixed():
+    # lagrede sesjoner bruker disse kodene – bare nye språk bakerst er lov
+    assert LANG_VALUES[:9] == (None, "no", "da", "sv", "es", "fr", "de", "fi", "en")
+
+
+@pytest.mark.parametrize("data", [
+    bytes((1, 0, 0, 0, 99)),        # user_lang
+    bytes((1, 0, 99, 0, 0)),        # active_view
+    bytes((1, 0, 0, 0, 1, 99)),     # historikk
+    bytes((2, 0, 0, 0, 0)),         # format
+    b"\x01",
+])
+def test_from_bytes_rejects_unknown_codes(data):
+    with pytest.raises(ValueError):
+        ChatState.from_bytes(data)
+
+
+def test_lang_history_is_read_only():
+    state = ChatState()
+    state.remember_lang("no")
+    with pytest.raises(AttributeError):
+        state.lang_history.append("en")
+    assert state.lang_history == ("no",)
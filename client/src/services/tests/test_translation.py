@@ -0,0 +1,126 @@
+import asyncio
+
+from translation import CircuitBreaker, FakeBackend, TranslationCache, Translator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _translator(clock, latency=0.0):
+    return Translator(
+        FakeBackend(latency=latency),
+        TranslationCache(max_entries=0),
+        timeout=5.0,
+        breaker=CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=clock),
+    )
+
+
+def test_cancelled_probe_releases_half_open_breaker():
+    clock = FakeClock()
+    translator = _translator(clock, latency=1.0)
+    translator.breaker.record_failure()
+    clock.now = 10.0
+    assert translator.breaker.state == "half_open"
+
+    async def cancel_probe():
+        task = asyncio.create_task(translator.translate_async("hello", "en", "no"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(cancel_probe())
+    # avbrutt prøvekall teller som feil: åpen igjen, og ny prøve etter reset_timeout
+    assert translator.breaker.state == "open"
+    clock.now = 20.0
+    translator.backend.latency = 0.0
+    assert translator.translate("hello", "en", "no") == "[en->no] hello"
+    assert translator.breaker.state == "closed"
+
+
+def test_cancelled_call_while_closed_is_not_a_failure():
+    clock = FakeClock()
+    translator = _translator(clock, latency=1.0)
+
+    async def cancel_call():
+        task = asyncio.create_task(translator.translate_async("hello", "en", "no"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_call())
+    assert translator.breaker.state == "closed"
+    assert translator.failures == 0
+
+
+def test_reset_translator_closes_disk_cache(tmp_path):
+    import translation
+
+    cache = TranslationCache(path=str(tmp_path / "cache.db"))
+    cache.put("no", "en", "hei", "hi")
+    old = translation.set_translator(Translator(FakeBackend(latency=0.0), cache))
+    try:
+        translation.reset_translator()
+        assert translation.TRANSLATOR is None
+        assert cache._db is None
+        # minne-delen virker fortsatt
+        assert cache.get("no", "en", "hei") == "hi"
+    finally:
+        translation.set_translator(old)
+
+
+class SlowSyncBackend:
+    """Bare sync translate; teller hvor mange kall som går samtidig."""
+
+    def __init__(self, latency):
+        import threading
+
+        self.latency = latency
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def translate(self, text, source, target):
+        import time
+
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.active -= 1
+        return text.upper()
+
+
+def test_sync_backend_calls_stay_bounded_after_timeouts():
+    backend = SlowSyncBackend(latency=0.3)
+    translator = Translator(
+        backend,
+        TranslationCache(max_entries=0),
+        timeout=0.05,
+        max_concurrency=2,
+        breaker=CircuitBreaker(failure_threshold=1000),
+    )
+
+    async def burst():
+        for _ in range(3):
+            results = await asyncio.gather(*(translator.translate_async(f"t{i}", "no", "en") for i in range(5)))
+            assert results == [f"t{i}" for i in range(5)]  # alle gikk over fristen
+            await asyncio.sleep(0.1)
+
+    try:
+        asyncio.run(burst())
+    finally:
+        translator._pool.shutdown(wait=True)
+    assert translator.timeouts == 15
+    assert backend.max_active == 2
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+from translation import FakeBackend, TranslationCache, Translator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TranslationCache(max_entries=10, ttl=60, clock=clock)
+    cache.put("no", "en", "hei", "hi")
+    clock.now += 60
+    assert cache.get("no", "en", "hei") == "hi"
+    clock.now += 1
+    assert cache.get("no", "en", "hei") is None
+    assert len(cache) == 0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TranslationCache(max_entries=2)
+    cache.put("no", "en", "a", "A")
+    cache.put("no", "en", "b", "B")
+    assert cache.get("no", "en", "a") == "A"  # b er nå eldst brukt
+    cache.put("no", "en", "c", "C")
+    assert cache.get("no", "en", "b") is None
+    assert cache.get("no", "en", "a") == "A" and cache.get("no", "en", "c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_a_new_cache_and_respects_ttl(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "cache.db")
+    first = TranslationCache(max_entries=10, ttl=60, path=path, clock=clock)
+    first.put("no", "en", "hei", "hi")
+    first.close()
+
+    second = TranslationCache(max_entries=10, ttl=60, path=path, clock=clock)
+    assert second.get("no", "en", "hei") == "hi"
+    assert second.stats()["disk_hits"] == 1
+    assert second.get("no", "en", "hei") == "hi"  # nå fra minnet
+    assert second.stats()["hits"] == 1
+
+    clock.now += 61
+    assert second.get("no", "en", "hei") is None
+    second.close()
+
+
+def test_translate_async_reads_and_writes_disk_off_the_loop(tmp_path):
+    path = str(tmp_path / "cache.db")
+    threads = []
+
+    class RecordingCache(TranslationCache):
+        def get_disk(self, *args):
+            threads.append(threading.current_thread())
+            return super().get_disk(*args)
+
+        def put_disk(self, *args):
+            threads.append(threading.current_thread())
+            return super().put_disk(*args)
+
+    backend = FakeBackend()
+    translator = Translator(backend, RecordingCache(path=path))
+
+    async def run():
+        first = await translator.translate_async("hei", "no", "en")
+        again = await translator.translate_async("hei", "no", "en")
+        return first, again, threading.current_thread()
+
+    first, again, loop_thread = asyncio.run(run())
+    assert first == again == "[no->en] hei"
+    assert backend.calls == 1
+    assert len(threads) == 2 and loop_thread not in threads  # bom på disk + lagring; andre kall fra minnet
+
+    # en ny oversetter på samme fil får treff fra disk uten å kalle backend
+    other = Translator(backend, TranslationCache(path=path))
+    assert asyncio.run(other.translate_async("hei", "no", "en")) == "[no->en] hei"
+    assert backend.calls == 1
+    translator.close()
+    other.close()
@@ -0,0 +1,299 @@
+# text_index.py
+"""
+Forhåndsbygde tekst-indekser for chatbot_core.
+Alt her jobber på tekst som ALLEREDE er normalisert med chatbot_core.norm().
+"""
+
+
+# ===================== AVSTAND =====================
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein-avstand mellom to normaliserte strenger."""
+    if a == b:
+        return 0
+    if not a:
+        return len(b)
+    if not b:
+        return len(a)
+
+    dp = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        prev = i - 1
+        cur = i
+        for j in range(1, len(b) + 1):
+            temp = dp[j]
+            dp[j] = min(
+                dp[j] + 1,
+                cur + 1,
+                prev + (0 if a[i - 1] == b[j - 1] else 1),
+            )
+            prev = temp
+            cur = dp[j]
+    return dp[len(b)]
+
+
+def bounded_distance(a: str, b: str, k: int) -> int:
+    """
+    Levenshtein-avstand med tak: returnerer avstanden hvis den er <= k, ellers k + 1.
+    Fyller bare et bånd på ±k rundt diagonalen og avbryter så fort
+    en hel rad er over k. Lengdeforskjell > k gir svar uten DP i det hele tatt.
+    """
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if abs(la - lb) > k:
+        return k + 1
+
+    # felles prefiks/suffiks påvirker ikke avstanden
+    start = 0
+    while start < la and start < lb and a[start] == b[start]:
+        start += 1
+    end_a, end_b = la, lb
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a = a[start:end_a]
+    b = b[start:end_b]
+    la, lb = len(a), len(b)
+    if not la or not lb:
+        d = la or lb
+        return d if d <= k else k + 1
+
+    big = k + 1
+    prev = [j if j <= k else big for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        lo = max(1, i - k)
+        hi = min(lb, i + k)
+        cur = [big] * (lb + 1)
+        if i <= k:
+            cur[0] = i
+        row_min = cur[0]
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            v = prev[j - 1] + (ca != b[j - 1])
+            if prev[j] + 1 < v:
+                v = prev[j] + 1
+            if cur[j - 1] + 1 < v:
+                v = cur[j - 1] + 1
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > k:
+            return big
+        prev = cur
+    d = prev[lb]
+    return d if d <= k else big
+
+
+# ===================== FUZZY-INDEKS (slette-nabolag) =====================
+
+def deletions(word: str, depth: int) -> set[str]:
+    """Alle varianter av word med inntil `depth` tegn slettet (inkl. word selv)."""
+    out = {word}
+    frontier = {word}
+    for _ in range(depth):
+        nxt = set()
+        for w in frontier:
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1:])
+        nxt -= out
+        out |= nxt
+        frontier = nxt
+    return out
+
+
+class FuzzyIndex:
+    """
+    SymSpell-aktig indeks over en ordliste.
+    Gir nøyaktig samme svar som den gamle lineære fuzzy_includes:
+      - treff hvis et nøkkelord finnes som substreng i teksten, eller
+      - et token ligger innenfor min(max_dist, max(1, len(k) // 3)) fra et nøkkelord.
+    Hvert nøkkelord lagres med alle sine slette-varianter, så et oppslag
+    bare trenger slette-variantene til tokenet + noen få verifiseringer.
+    """
+
+    def __init__(self, keywords, max_dist: int = 2):
+        self.max_dist = max_dist
+        # normaliserte nøkkelord, uten tomme og duplikater (rekkefølge beholdt)
+        self.keywords = tuple(dict.fromkeys(k for k in keywords if k))
+        self._keyword_set = frozenset(self.keywords)
+        self.allowed = {k: min(max_dist, max(1, len(k) // 3)) for k in self.keywords}
+        self.depth = max(self.allowed.values(), default=0)
+
+        self._deletes: dict[str, list[str]] = {}
+        for k, allowed in self.allowed.items():
+            for variant in deletions(k, allowed):
+                self._deletes.setdefault(variant, []).append(k)
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def match_token(self, tok: str) -> str | None:
+        """Returner et nøkkelord innenfor tillatt avstand fra tok, ellers None."""
+        if tok in self.allowed:
+            return tok
+        for variant in deletions(tok, self.depth):
+            for k in self._deletes.get(variant, ()):
+                allowed = self.allowed[k]
+                if bounded_distance(tok, k, allowed) <= allowed:
+                    return k
+        return None
+
+    def search(self, t: str, tokens=None, phrases=None) -> bool:
+        """
+        t: normalisert tekst, tokens: t.split() (kan sendes inn for å spare en split).
+        phrases: ferdige substreng-treff fra en PhraseMatcher som dekker alle
+        nøkkelordene her – da slipper vi å lete etter hvert nøkkelord i t.
+        """
+        if phrases is not None:
+            if not self._keyword_set.isdisjoint(phrases):
+                return True
+        elif any(k in t for k in self.keywords):
+            return True
+        if tokens is None:
+            tokens = t.split()
+        return any(self.match_token(tok) is not None for tok in tokens)
+
+
+# ===================== AUTOCORRECT-INDEKS =====================
+
+def _char_signature(word: str) -> int:
+    """Bitmaske over hvilke tegn ordet inneholder (hashet til 64 bit)."""
+    sig = 0
+    for ch in word:
+        sig |= 1 << (ord(ch) & 63)
+    return sig
+
+
+class VocabCorrector:
+    """
+    Nærmeste ord i et fast vokabular, uten å sammenligne mot hele vokabularet.
+      1) slette-nabolag (som FuzzyIndex): hvert ord lagres med alle varianter
+         med inntil max_dist tegn slettet. Et ord innenfor avstand k fra tokenet
+         deler en slik variant med en av tokenets egne slette-varianter (<= k),
+         så et oppslag koster like mye uansett hvor stort vokabularet er
+      2) tegn-signatur: hver redigering endrer tegnsettet med maks 2 tegn
+      3) bounded_distance på de få som er igjen
+    Ved lik avstand vinner ordet som kom først i `pairs` – samme regel som den
+    gamle lineære løkka.
+    """
+
+    def __init__(self, pairs, max_dist: int = 2):
+        # pairs: (ord slik det skal returneres, normalisert ord)
+        self.max_dist = max_dist
+        self.words = [w for w, _ in pairs]
+        self.normed = [n for _, n in pairs]
+        self._sigs = [_char_signature(n) for n in self.normed]
+        self._lens = [len(n) for n in self.normed]
+        self._deletes: dict[str, list[int]] = {}
+        for idx, n in enumerate(self.normed):
+            for variant in deletions(n, max_dist):
+                self._deletes.setdefault(variant, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _candidates(self, tok: str, max_dist: int) -> list[int]:
+        if max_dist > self.max_dist:
+            raise ValueError(f"max_dist {max_dist} > {self.max_dist} som indeksen er bygget for")
+        lt = len(tok)
+        lengths = self._lens
+        found: set[int] = set()
+        for variant in deletions(tok, max_dist):
+            for idx in self._deletes.get(variant, ()):
+                if abs(lengths[idx] - lt) <= max_dist:
+                    found.add(idx)
+        return sorted(found)
+
+    def nearest(self, tok: str, max_dist: int) -> tuple[str, int] | None:
+        """(ord, avstand) for nærmeste ord innenfor max_dist, ellers None."""
+        sig = _char_signature(tok)
+        best_idx = -1
+        best_dist = max_dist + 1
+        for idx in self._candidates(tok, max_dist):
+            limit = best_dist - 1
+            if (sig ^ self._sigs[idx]).bit_count() > 2 * limit:
+                continue
+            d = bounded_distance(tok, self.normed[idx], limit)
+            if d < best_dist:
+                best_dist = d
+                best_idx = idx
+                if d == 0:
+                    break
+        if best_idx < 0:
+            return None
+        return self.words[best_idx], best_dist
+
+
+# ===================== FRASE-AUTOMAT (Aho–Corasick) =====================
+
+class PhraseMatcher:
+    """
+    Aho–Corasick-automat over faste fraser. Ett lineært pass over teksten
+    finner alle forekomster av alle fraser, uansett hvor mange fraser det er.
+    """
+
+    def __init__(self, patterns=()):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[str, ...]] = [()]
+        self.patterns: set[str] = set()
+        for p in patterns:
+            self.add(p)
+        self.build()
+
+    def add(self, pattern: str) -> None:
+        """Legg til en frase. build() må kalles etterpå."""
+        if not pattern or pattern in self.patterns:
+            return
+        self.patterns.add(pattern)
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state] = self._out[state] + (pattern,)
+
+    def build(self) -> None:
+        """Regn ut fail-lenker (bredde først) og slå sammen utdata langs dem."""
+        queue = list(self._goto[0].values())
+        for s in queue:
+            self._fail[s] = 0
+        head = 0
+        while head < len(queue):
+            s = queue[head]
+            head += 1
+            for ch, nxt in self._goto[s].items():
+                queue.append(nxt)
+                f = self._fail[s]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> list[tuple[int, int, str]]:
+        """Alle treff som (start, slutt, frase), sortert på slutt-posisjon."""
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = i + 1
+                for p in out[state]:
+                    hits.append((end - len(p), end, p))
+        return hits
+
+
+def token_aligned(text: str, start: int, end: int) -> bool:
+    """True hvis text[start:end] starter og slutter på ordgrense (normalisert tekst)."""
+    return (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " ")
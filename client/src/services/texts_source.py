@@ -0,0 +1,124 @@
+# texts_source.py
+"""
+Hvor tekstene til chatboten (ordlister, svarmaler, treningsdata) leses fra.
+
+Standard er bot_texts.py. BOT_TEXTS_PATH kan peke på en annen .py-fil med
+de samme navnene, eller på en JSON-fil {navn: verdi} som overstyrer bare
+navnene den har (resten hentes fra bot_texts). Begge gir samme dict via
+load_texts(), og chatbot_core.reload_texts() bygger på nytt fra den.
+
+TextsWatcher sjekker filene med jevne mellomrom og kaller en funksjon når
+noen av dem er endret (BOT_TEXTS_RELOAD=<sekunder> i handler.py).
+"""
+import json
+import logging
+import os
+import runpy
+import threading
+
+import bot_texts
+
+log = logging.getLogger(__name__)
+
+# navnene chatbot_core bruker fra bot_texts
+TEXT_NAMES = (
+    "KEYWORD_TAGS",
+    "QUESTION_WORDS",
+    "YES_WORDS", "NO_WORDS",
+    "THANK_WORDS", "GREET_WORDS", "FAREWELL_WORDS",
+    "ADMIN_WORDS", "RELEASE_WORDS", "RELEASE_QUESTION_WORDS",
+    "GAMEPLAY_WORDS", "DOMAIN_WORDS", "TEAM_SIZE_WORDS",
+    "WHAT_IS_VINTRA_WORDS", "WHAT_IS_VOTE_WORDS", "TEAM_WORDS",
+    "PRICE_WORDS", "SUPPORT_WORDS",
+    "FOLLOWUP_WHAT_WORDS", "FOLLOWUP_WHO_WORDS",
+    "AMBIGUOUS_GREETINGS",
+    "LANG_HINT_WORDS",
+    "ML_TRAIN_DATA",
+    "REPLY_TEMPLATES",
+)
+
+
+def texts_path() -> str:
+    return os.environ.get("BOT_TEXTS_PATH") or bot_texts.__file__
+
+
+def load_texts(path: str | None = None) -> dict:
+    """{navn: verdi} for alle TEXT_NAMES fra path (standard texts_path())."""
+    path = path or texts_path()
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        unknown = sorted(set(data) - set(TEXT_NAMES))
+        if unknown:
+            raise ValueError(f"{path}: ukjente navn {', '.join(unknown)}")
+        texts = {name: getattr(bot_texts, name) for name in TEXT_NAMES}
+        for name, value in data.items():
+            # JSON har ikke sett – bruk samme type som i bot_texts
+            texts[name] = set(value) if isinstance(texts[name], (set, frozenset)) else value
+        return texts
+
+    # kjøres i et eget navnerom, så den importerte bot_texts-modulen ikke endres
+    namespace = runpy.run_path(path)
+    missing = [name for name in TEXT_NAMES if name not in namespace]
+    if missing:
+        raise ValueError(f"{path}: mangler {', '.join(missing)}")
+    return {name: namespace[name] for name in TEXT_NAMES}
+
+
+class TextsWatcher:
+    """
+    Bakgrunnstråd som sjekker mtime på paths hvert interval sekund og kaller
+    on_change() når en av dem er endret. Feiler on_change (f.eks. syntaksfeil
+    i filen), beholdes de gamle tekstene og feilen ligger i last_error.
+    """
+
+    def __init__(self, paths, on_change, interval: float = 2.0):
+        self.paths = tuple(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self.reloads = 0
+        self.last_error: str | None = None
+        self._mtimes = self._stat()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _stat(self) -> tuple:
+        mtimes = []
+        for path in self.paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def check(self) -> bool:
+        """Kall on_change hvis noe er endret siden sist. True hvis den ble kalt."""
+        mtimes = self._stat()
+        if mtimes == self._mtimes:
+            return False
+        self._mtimes = mtimes
+        try:
+            self.on_change()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            log.error("bot_texts reload feilet: %s", self.last_error)
+        else:
+            self.last_error = None
+            self.reloads += 1
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> "TextsWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="texts-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
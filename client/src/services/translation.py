@@ -0,0 +1,550 @@
+# translation.py
+"""
+Oversettelse inn/ut for chatbot_core.
+Backend er pluggbar (GoogleTranslator som standard), så tester kan bruke en stub,
+og alle oppslag går via en cache (minne-LRU + valgfri SQLite-fil på disk).
+
+Konfig via miljøvariabler:
+  TRANSLATION_CACHE_SIZE   maks antall oversettelser i minnet (standard 5000)
+  TRANSLATION_CACHE_TTL    sekunder en oversettelse er gyldig (standard 7 dager)
+  TRANSLATION_CACHE_PATH   SQLite-fil for disk-cache (av hvis ikke satt)
+  TRANSLATION_CACHE_DISK_SIZE  maks antall rader på disk (standard 100000)
+  TRANSLATION_TIMEOUT      frist i sekunder pr. async oversettelse (standard 2.0)
+  TRANSLATION_MAX_CONCURRENCY  maks samtidige async kall til backend (standard 8)
+  TRANSLATION_BREAKER_THRESHOLD  feil på rad før kretsbryteren åpner (standard 5)
+  TRANSLATION_BREAKER_RESET  sekunder før en åpen kretsbryter prøver igjen (standard 30)
+
+deep_translator importeres først ved første oversettelse, og den globale
+oversetteren lages først når den trengs (get_translator), så import er billig.
+"""
+import asyncio
+import importlib.util
+import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import gauge_lines, register_collector
+
+GT = None  # deep_translator.GoogleTranslator, importeres ved første bruk
+
+
+def _google_translator():
+    global GT
+    if GT is None:
+        from deep_translator import GoogleTranslator as GT
+    return GT
+
+
+# ===================== BACKENDS =====================
+
+class GoogleBackend:
+    """deep_translator.GoogleTranslator – ett nettverkskall pr. oversettelse."""
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        return _google_translator()(source=source, target=target).translate(text)
+
+
+class FakeBackend:
+    """
+    Lokal falsk backend for tester og lasttester: legger på `latency` sekunder
+    og feiler med sannsynlighet `fail_rate`. Har både sync og async variant.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self._rnd = random.Random(seed)
+
+    def _result(self, text: str, source: str, target: str) -> str:
+        self.calls += 1
+        if self.fail_rate and self._rnd.random() < self.fail_rate:
+            raise RuntimeError("FakeBackend: simulert feil")
+        return f"[{source}->{target}] {text}"
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(text, source, target)
+
+    async def atranslate(self, text: str, source: str, target: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(text, source, target)
+
+
+def default_backend():
+    """GoogleBackend hvis deep_translator er installert, ellers None (ingen oversettelse)."""
+    # find_spec sjekker bare at pakken finnes – selve importen skjer ved første kall
+    if GT is None and importlib.util.find_spec("deep_translator") is None:
+        return None
+    return GoogleBackend()
+
+
+# ===================== CACHE =====================
+
+class TranslationCache:
+    """
+    Cache for oversettelser, nøkkel (kilde, mål, tekst).
+    Minne-tier: LRU med maks max_entries. Disk-tier (valgfri): SQLite med maks
+    max_disk_entries rader. Begge respekterer ttl (sekunder).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl: float = 7 * 24 * 3600,
+        path: str | None = None,
+        max_disk_entries: int = 100_000,
+        clock=time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._clock = clock
+        self._mem: OrderedDict[tuple[str, str, str], tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " source TEXT, target TEXT, text TEXT, result TEXT, stored_at REAL,"
+                " PRIMARY KEY (source, target, text))"
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> "TranslationCache":
+        return cls(
+            max_entries=int(os.environ.get("TRANSLATION_CACHE_SIZE", 5000)),
+            ttl=float(os.environ.get("TRANSLATION_CACHE_TTL", 7 * 24 * 3600)),
+            path=os.environ.get("TRANSLATION_CACHE_PATH") or None,
+            max_disk_entries=int(os.environ.get("TRANSLATION_CACHE_DISK_SIZE", 100_000)),
+        )
+
+    def close(self) -> None:
+        """Lukk SQLite-forbindelsen (cachen virker videre bare i minnet)."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._mem)
+
+    @property
+    def on_disk(self) -> bool:
+        """True hvis get_disk/put_disk gjør SQLite-I/O (og bør kjøres utenfor event-loopen)."""
+        return self._db is not None
+
+    def get(self, source: str, target: str, text: str) -> str | None:
+        result = self.get_memory(source, target, text)
+        return result if result is not None else self.get_disk(source, target, text)
+
+    def get_memory(self, source: str, target: str, text: str) -> str | None:
+        """Bare minne-tieren; en bom telles først i get_disk."""
+        key = (source, target, text)
+        now = self._clock()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                result, stored_at = entry
+                if now - stored_at <= self.ttl:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._mem[key]
+            return None
+
+    def get_disk(self, source: str, target: str, text: str) -> str | None:
+        """Disk-tieren (etter get_memory); et treff legges også i minnet."""
+        key = (source, target, text)
+        now = self._clock()
+        with self._lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT result, stored_at FROM translations WHERE source=? AND target=? AND text=?",
+                    key,
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, source: str, target: str, text: str, result: str) -> None:
+        self.put_memory(source, target, text, result)
+        self.put_disk(source, target, text, result)
+
+    def put_memory(self, source: str, target: str, text: str, result: str) -> None:
+        with self._lock:
+            self._remember((source, target, text), result, self._clock())
+
+    def put_disk(self, source: str, target: str, text: str, result: str) -> None:
+        now = self._clock()
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                (source, target, text, result, now),
+            )
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 100:
+                self._prune_disk(now)
+            self._db.commit()
+
+    def _remember(self, key, result: str, stored_at: float) -> None:
+        self._mem[key] = (result, stored_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self, now: float) -> None:
+        self._puts_since_prune = 0
+        self._db.execute("DELETE FROM translations WHERE stored_at < ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM translations WHERE rowid IN ("
+            " SELECT rowid FROM translations ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM translations")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._mem),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+# ===================== KRETSBRYTER =====================
+
+class CircuitBreaker:
+    """
+    closed -> open etter `failure_threshold` feil på rad. Mens den er åpen
+    avvises alle kall med en gang. Etter `reset_timeout` sekunder slippes ett
+    prøvekall gjennom (half_open): suksess lukker, feil åpner igjen.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+        self.rejections = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejections += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+    def record_cancelled(self) -> None:
+        """Kallet ble avbrutt før det var ferdig. Var det prøvekallet, regnes det som feil."""
+        with self._lock:
+            if self._trial_running:
+                self._opened_at = self._clock()
+                self._trial_running = False
+
+
+# ===================== OVERSETTER =====================
+
+class Translator:
+    """
+    Cache + kretsbryter foran en backend. Feil i backend gir uoversatt tekst
+    tilbake (som før). translate_async legger på frist pr. kall og en grense
+    for hvor mange kall som kan gå mot backend samtidig.
+    Backend trenger translate(text, source, target); har den også en async
+    atranslate brukes den, ellers kjøres translate i en egen trådpool med
+    max_concurrency tråder. Et kall som går over fristen, fortsetter i tråden
+    og holder plassen til det er ferdig, så grensen gjelder faktiske kall.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        cache: TranslationCache | None = None,
+        timeout: float = 2.0,
+        max_concurrency: int = 8,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.backend = backend
+        self.cache = cache if cache is not None else TranslationCache()
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        # én semafor pr. event loop (asyncio-primitiver kan ikke deles mellom looper)
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, backend=None) -> "Translator":
+        return cls(
+            backend,
+            TranslationCache.from_env(),
+            timeout=float(os.environ.get("TRANSLATION_TIMEOUT", 2.0)),
+            max_concurrency=int(os.environ.get("TRANSLATION_MAX_CONCURRENCY", 8)),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get("TRANSLATION_BREAKER_THRESHOLD", 5)),
+                reset_timeout=float(os.environ.get("TRANSLATION_BREAKER_RESET", 30.0)),
+            ),
+        )
+
+    def _lookup(self, text: str, source: str, target: str) -> str | None:
+        """Svar uten backend hvis mulig: tom tekst, ingen backend, cache-treff eller åpen bryter."""
+        if not text or self.backend is None or source == target:
+            return text
+        cached = self.cache.get(source, target, text)
+        if cached is not None:
+            return cached
+        if not self.breaker.allow():
+            return text
+        return None
+
+    async def _lookup_async(self, text: str, source: str, target: str) -> str | None:
+        """Som _lookup, men disk-cachen leses i en tråd, ikke i event-loopen."""
+        if not text or self.backend is None or source == target:
+            return text
+        cached = self.cache.get_memory(source, target, text)
+        if cached is None:
+            if self.cache.on_disk:
+                cached = await asyncio.to_thread(self.cache.get_disk, source, target, text)
+            else:
+                cached = self.cache.get_disk(source, target, text)
+        if cached is not None:
+            return cached
+        if not self.breaker.allow():
+            return text
+        return None
+
+    def _store(self, text: str, source: str, target: str, result) -> str:
+        self.breaker.record_success()
+        if not result:
+            return text
+        self.cache.put(source, target, text, result)
+        return result
+
+    async def _store_async(self, text: str, source: str, target: str, result) -> str:
+        self.breaker.record_success()
+        if not result:
+            return text
+        self.cache.put_memory(source, target, text, result)
+        if self.cache.on_disk:
+            await asyncio.to_thread(self.cache.put_disk, source, target, text, result)
+        return result
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        done = self._lookup(text, source, target)
+        if done is not None:
+            return done
+
+        self.calls += 1
+        try:
+            result = self.backend.translate(text, source, target)
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            return text
+        return self._store(text, source, target, result)
+
+    def translate_many(self, requests) -> list[str]:
+        """requests: liste av (tekst, kilde, mål). Like forespørsler oversettes bare én gang."""
+        done = {req: self.translate(*req) for req in dict.fromkeys(requests)}
+        return [done[req] for req in requests]
+
+    async def translate_many_async(self, requests) -> list[str]:
+        """Som translate_many, men alle (unike) kall går samtidig via translate_async."""
+        unique = list(dict.fromkeys(requests))
+        results = await asyncio.gather(*(self.translate_async(*req) for req in unique))
+        done = dict(zip(unique, results))
+        return [done[req] for req in requests]
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            sem = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return sem
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="translate")
+        return self._pool
+
+    async def _call_backend(self, text: str, source: str, target: str) -> str:
+        atranslate = getattr(self.backend, "atranslate", None)
+        if atranslate is not None:
+            async with self._semaphore():
+                return await atranslate(text, source, target)
+        # ikke loopens standard-executor: en treg backend skal ikke fylle den for andre
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._thread_pool(), self.backend.translate, text, source, target)
+
+    def close(self) -> None:
+        """Lukk cachen og trådpoolen (kall som pågår, får gjøre seg ferdig)."""
+        self.cache.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def translate_async(self, text: str, source: str, target: str) -> str:
+        done = await self._lookup_async(text, source, target)
+        if done is not None:
+            return done
+
+        self.calls += 1
+        try:
+            # fristen dekker også ventetiden på semaforen / en ledig tråd
+            result = await asyncio.wait_for(self._call_backend(text, source, target), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.failures += 1
+            self.breaker.record_failure()
+            return text
+        except asyncio.CancelledError:
+            # ellers blir et avbrutt prøvekall stående som "pågår", og bryteren slipper aldri mer gjennom
+            self.breaker.record_cancelled()
+            raise
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            return text
+        return await self._store_async(text, source, target, result)
+
+
+TRANSLATOR: Translator | None = None  # lages ved første bruk, se get_translator
+_TRANSLATOR_LOCK = threading.Lock()
+
+
+def get_translator() -> Translator:
+    """Global oversetter; lages fra miljøvariablene første gang den trengs."""
+    global TRANSLATOR
+    if TRANSLATOR is None:
+        with _TRANSLATOR_LOCK:
+            if TRANSLATOR is None:
+                TRANSLATOR = Translator.from_env(default_backend())
+    return TRANSLATOR
+
+
+def _translator_metrics() -> list[str]:
+    """Tellerne til den globale oversetteren (ingen linjer før den er laget)."""
+    translator = TRANSLATOR
+    if translator is None:
+        return []
+    cache = translator.cache.stats()
+    breaker_open = {"closed": 0, "half_open": 0.5, "open": 1}[translator.breaker.state]
+    return (
+        gauge_lines("chatbot_translator_calls_total", "Kall til oversettelses-backend.", translator.calls, "counter")
+        + gauge_lines("chatbot_translator_failures_total", "Feilede oversettelser (inkl. timeout).", translator.failures, "counter")
+        + gauge_lines("chatbot_translator_timeouts_total", "Oversettelser som gikk over fristen.", translator.timeouts, "counter")
+        + gauge_lines("chatbot_translator_breaker_rejections_total", "Kall avvist av kretsbryteren.", translator.breaker.rejections, "counter")
+        + gauge_lines("chatbot_translator_breaker_open", "Kretsbryter: 0 lukket, 0.5 halvåpen, 1 åpen.", breaker_open)
+        + gauge_lines("chatbot_translation_cache_hits_total", "Treff i oversettelses-cachen (minne + disk).", cache["hits"] + cache["disk_hits"], "counter")
+        + gauge_lines("chatbot_translation_cache_misses_total", "Bom i oversettelses-cachen.", cache["misses"], "counter")
+    )
+
+
+register_collector(_translator_metrics)
+
+
+def warmup_translator() -> Translator:
+    """Lag global oversetter og importer backend-biblioteket nå (ved oppstart av server)."""
+    translator = get_translator()
+    if isinstance(translator.backend, GoogleBackend):
+        _google_translator()
+    return translator
+
+
+def set_translator(translator: Translator | None) -> Translator | None:
+    """Bytt global oversetter (f.eks. med en stub i tester). Returnerer den gamle."""
+    global TRANSLATOR
+    old = TRANSLATOR
+    TRANSLATOR = translator
+    return old
+
+
+def reset_translator() -> None:
+    """
+    Lukk og glem den globale oversetteren; neste kall lager en ny fra miljøet.
+    Brukes før fork (prefork.py), så ingen worker arver cachens SQLite-forbindelse.
+    """
+    old = set_translator(None)
+    if old is not None:
+        old.close()
+
+
+def translate(text: str, source: str, target: str) -> str:
+    return get_translator().translate(text, source, target)
+
+
+def translate_many(requests) -> list[str]:
+    return get_translator().translate_many(requests)
+
+
+async def translate_async(text: str, source: str, target: str) -> str:
+    return await get_translator().translate_async(text, source, target)
+
+
+async def translate_many_async(requests) -> list[str]:
+    return await get_translator().translate_many_async(requests)